@@ -0,0 +1,25 @@
+"""
+pytest setup for the repository-root test scripts
+
+The session fixtures are defined in mcp-server/conftest.py. They are loaded
+here as well so test_integration.py and test_benchmarks.py can use them, and
+pytest can be run from either directory.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+MCP_DIR = Path(__file__).resolve().parent / "mcp-server"
+
+# Make the MCP server modules importable from any test module
+sys.path.insert(0, str(MCP_DIR))
+
+_spec = importlib.util.spec_from_file_location("mcp_server_conftest", MCP_DIR / "conftest.py")
+_fixtures = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_fixtures)
+
+loop = _fixtures.loop
+mcp_server = _fixtures.mcp_server
+http_client = _fixtures.http_client
+pytest_sessionfinish = _fixtures.pytest_sessionfinish
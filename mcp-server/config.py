@@ -3,12 +3,16 @@ Configuration settings for Meridian MCP Server
 """
 import os
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Optional
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Backend database in this checkout, used unless MERIDIAN_DB_PATH is set
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[1] / "Backend" / "meridian.db"
+
 @dataclass
 class Config:
     """Configuration class for Meridian MCP Server"""
@@ -18,7 +22,7 @@ class Config:
     backend_url: str = os.getenv("MERIDIAN_BACKEND_URL", "http://localhost:8000")
     
     # Database Configuration
-    db_path: str = os.getenv("MERIDIAN_DB_PATH", "/Users/arnabmaity/Documents/Meridian/Backend/meridian.db")
+    db_path: str = os.getenv("MERIDIAN_DB_PATH", str(DEFAULT_DB_PATH))
     
     # Server Configuration
     server_name: str = "meridian-mcp"
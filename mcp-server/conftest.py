@@ -0,0 +1,37 @@
+"""
+Session fixtures shared by the Meridian test scripts
+
+All async work in tests goes through the session `loop` fixture with
+loop.run_until_complete. Never call asyncio.run inside a test: it would start
+a second loop, and the shared server's pooled HTTP connections and cached
+tasks belong to the session loop.
+
+The repository-root conftest.py loads this file too, so test_integration.py
+and test_benchmarks.py get the same fixtures. The objects themselves live in
+meridian_testing, so both copies hand out one loop, server and client.
+"""
+import pytest
+
+from meridian_testing import close_session, session_loop, shared_http_client, shared_server
+
+
+@pytest.fixture(scope="session")
+def loop():
+    """The single event loop every test runs its coroutines on"""
+    return session_loop()
+
+
+@pytest.fixture(scope="session")
+def mcp_server(loop):
+    """The module-level server from server.py, shared by every test"""
+    return shared_server()
+
+
+@pytest.fixture(scope="session")
+def http_client(loop):
+    """Pooled client for backend probes"""
+    return shared_http_client()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    close_session()
@@ -5,13 +5,22 @@ AI-powered DevOps culture navigation using Gemini AI
 import asyncio
 import json
 import logging
+import re
 import sqlite3
+import string
+from collections import defaultdict
 from datetime import datetime, timedelta
+from itertools import chain
 from typing import Dict, List, Any, Optional
 import google.generativeai as genai
+import orjson
+from cachetools import LFUCache
 
 logger = logging.getLogger("devops-culture-tools")
 
+# Gemini often wraps JSON replies in ```json fences
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
 # DevOps Culture Framework
 DEVOPS_MATURITY_FRAMEWORK = {
     "levels": {
@@ -30,6 +39,183 @@ DEVOPS_MATURITY_FRAMEWORK = {
     }
 }
 
+# Comprehensive question bank for different levels and categories
+_QUESTION_BANK = {
+    "advanced": [
+        {
+            "category": "Culture",
+            "question": "How does your organization approach post-incident reviews?",
+            "options": ["No reviews", "Blame assignment", "Basic analysis", "Blameless postmortems", "Learning-focused retrospectives"],
+            "focus": "culture_maturity"
+        },
+        {
+            "category": "Automation", 
+            "question": "How sophisticated is your Infrastructure as Code implementation?",
+            "options": ["No IaC", "Basic scripts", "Templated infrastructure", "Immutable infrastructure", "Self-healing systems"],
+            "focus": "infrastructure_automation"
+        },
+        {
+            "category": "Monitoring",
+            "question": "How comprehensive is your observability strategy?",
+            "options": ["Basic logs", "Metrics + logs", "Distributed tracing", "Full observability", "Predictive monitoring"],
+            "focus": "observability_maturity"
+        },
+        {
+            "category": "Collaboration",
+            "question": "How does your team handle cross-functional decision making?",
+            "options": ["Siloed decisions", "Manager approval", "Team consensus", "Delegated authority", "Autonomous teams"],
+            "focus": "team_autonomy"
+        },
+        {
+            "category": "Delivery",
+            "question": "What's your approach to feature flags and progressive deployment?",
+            "options": ["No feature flags", "Basic toggles", "Targeted rollouts", "Canary deployments", "Advanced experimentation"],
+            "focus": "deployment_sophistication"
+        },
+        {
+            "category": "Culture",
+            "question": "How does your organization approach learning from failures?",
+            "options": ["Avoid discussion", "Assign blame", "Document lessons", "Systematic learning", "Failure celebration"],
+            "focus": "learning_culture"
+        },
+        {
+            "category": "Automation",
+            "question": "How mature is your test automation strategy?",
+            "options": ["Manual testing", "Unit tests", "Integration tests", "E2E automation", "AI-powered testing"],
+            "focus": "testing_maturity"
+        },
+        {
+            "category": "Monitoring",
+            "question": "How proactive is your incident prevention approach?",
+            "options": ["Reactive only", "Basic alerting", "Predictive alerts", "Chaos engineering", "Self-healing systems"],
+            "focus": "reliability_engineering"
+        },
+        {
+            "category": "Collaboration",
+            "question": "How does your team approach knowledge sharing?",
+            "options": ["Ad-hoc sharing", "Documentation", "Regular sessions", "Pair programming", "Communities of practice"],
+            "focus": "knowledge_management"
+        },
+        {
+            "category": "Delivery",
+            "question": "How sophisticated is your deployment pipeline?",
+            "options": ["Manual deployment", "Basic CI/CD", "Multi-stage pipeline", "Zero-downtime deployment", "Autonomous deployment"],
+            "focus": "deployment_automation"
+        },
+        {
+            "category": "Culture",
+            "question": "How does your organization approach psychological safety?",
+            "options": ["Not considered", "Aware but limited", "Actively building", "Strong foundation", "Exemplary culture"],
+            "focus": "psychological_safety"
+        },
+        {
+            "category": "Automation",
+            "question": "How comprehensive is your security automation?",
+            "options": ["Manual security", "Basic scanning", "Pipeline integration", "Continuous compliance", "Zero-trust automation"],
+            "focus": "security_automation"
+        },
+        {
+            "category": "Monitoring",
+            "question": "How effective is your performance optimization process?",
+            "options": ["No optimization", "Ad-hoc tuning", "Regular reviews", "Continuous optimization", "AI-driven optimization"],
+            "focus": "performance_culture"
+        },
+        {
+            "category": "Collaboration",
+            "question": "How mature is your incident response coordination?",
+            "options": ["Chaotic response", "Basic procedures", "Defined roles", "Well-orchestrated", "Self-organizing response"],
+            "focus": "incident_coordination"
+        },
+        {
+            "category": "Delivery",
+            "question": "How data-driven is your product development approach?",
+            "options": ["Assumption-based", "Basic analytics", "A/B testing", "Advanced experimentation", "ML-powered insights"],
+            "focus": "data_driven_development"
+        }
+    ]
+}
+
+# Fallback question selections keyed by (level, weak areas, count); the key
+# space is small and the hot keys repeat whenever Gemini is degraded
+_FALLBACK_CACHE = LFUCache(maxsize=256)
+
+def _build_question_index(bank: Dict[str, List[Dict]]) -> Dict[str, Dict[str, List[Dict]]]:
+    """Index the question bank by level and lower-cased category"""
+    index = {}
+    for level, questions in bank.items():
+        by_category = defaultdict(list)
+        for question in questions:
+            by_category[question["category"].lower()].append(question)
+        index[level] = dict(by_category)
+    return index
+
+_QUESTION_INDEX = _build_question_index(_QUESTION_BANK)
+
+# Gemini prompt templates; only the per-request values are substituted
+_QUESTION_SCHEMA_JSON = orjson.dumps([{
+    "category": "Collaboration|Automation|Monitoring|Culture|Delivery",
+    "question": "text",
+    "options": ["5 options, worst to best"],
+    "focus": "specific_area",
+    "difficulty": "level"
+}]).decode()
+
+_ADAPTIVE_PROMPT_TMPL = string.Template(
+    "Generate $n DevOps culture assessment questions for a $level level practitioner. "
+    "Improvement areas: $areas. Mix technical practices and cultural aspects. "
+    "Return a JSON array of: $schema"
+)
+
+_TRENDS_SCHEMA_JSON = orjson.dumps({
+    "trend_direction": "improving|declining|stable",
+    "progress_rate": "rapid|steady|slow",
+    "key_insights": ["insight"],
+    "personalized_recommendations": ["recommendation"],
+    "motivation_message": "text"
+}).decode()
+
+_TRENDS_PROMPT_TMPL = string.Template(
+    "Analyze this DevOps practitioner's progress. "
+    "Assessment history (oldest to newest): $history. "
+    "Return a JSON object: $schema"
+)
+
+# Ask Gemini for structured JSON output instead of prose
+_JSON_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "temperature": 0.3,
+    "max_output_tokens": 2048
+}
+
+def _extract_json(text: str) -> Any:
+    """Parse JSON from a Gemini reply, tolerating code fences and surrounding prose"""
+    fenced = _JSON_FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    
+    starts = [i for i in (text.find("["), text.find("{")) if i != -1]
+    if starts:
+        end = max(text.rfind("]"), text.rfind("}")) + 1
+        text = text[min(starts):end]
+    
+    return orjson.loads(text)
+
+async def _generate_json(gemini_model, prompt: str) -> Any:
+    """Ask Gemini for JSON, re-prompting once if the reply cannot be parsed"""
+    response = await gemini_model.generate_content_async(
+        prompt, generation_config=_JSON_GENERATION_CONFIG
+    )
+    try:
+        return _extract_json(response.text)
+    except orjson.JSONDecodeError:
+        logger.warning("Gemini returned invalid JSON, retrying with strict prompt")
+    
+    response = await gemini_model.generate_content_async(
+        f"{prompt}\n\nReturn ONLY valid JSON, no prose.",
+        generation_config=_JSON_GENERATION_CONFIG
+    )
+    return _extract_json(response.text)
+
 async def devops_culture_assessment(
     assessment_context: Dict[str, Any],
     analysis_type: str = "comprehensive",
@@ -43,7 +229,7 @@ async def devops_culture_assessment(
         assessment_responses = assessment_context.get("assessment_responses", {})
         user_history = assessment_context.get("user_history", [])
         
-        logger.info(f"Processing assessment for user: {team_info.get('id', 'unknown')}")
+        logger.info("Processing assessment for user: %s", team_info.get('id', 'unknown'))
         
         # Simple fallback scoring for now to avoid f-string issues
         scores = {
@@ -83,7 +269,7 @@ async def devops_culture_assessment(
         }
         
     except Exception as e:
-        logger.error(f"DevOps culture assessment failed: {e}")
+        logger.error("DevOps culture assessment failed: %s", e)
         return {"error": str(e), "status": "failed"}
 
 def generate_basic_recommendations(scores: Dict[str, int]) -> List[Dict[str, str]]:
@@ -187,7 +373,7 @@ Focus on:
         return analyze_responses_fallback(responses, metrics)
         
     except Exception as e:
-        logger.error(f"AI analysis failed: {e}")
+        logger.error("AI analysis failed: %s", e)
         return analyze_responses_fallback(responses, metrics)
 
 def analyze_responses_fallback(responses: Dict, metrics: List) -> Dict[str, int]:
@@ -253,14 +439,14 @@ async def generate_improvement_recommendations(
     
     try:
         if gemini_model:
-            response = gemini_model.generate_content(recommendations_prompt)
+            response = await gemini_model.generate_content_async(recommendations_prompt)
             # Extract and parse recommendations
             return parse_ai_recommendations(response.text)
         else:
             return generate_fallback_recommendations(maturity_scores)
             
     except Exception as e:
-        logger.error(f"Recommendations generation failed: {e}")
+        logger.error("Recommendations generation failed: %s", e)
         return generate_fallback_recommendations(maturity_scores)
 
 def generate_fallback_recommendations(scores: Dict[str, int]) -> List[Dict[str, Any]]:
@@ -536,13 +722,13 @@ async def personalized_devops_guidance(
         """
         
         if gemini_model:
-            response = gemini_model.generate_content(guidance_prompt)
+            response = await gemini_model.generate_content_async(guidance_prompt)
             return parse_guidance_response(response.text, user)
         else:
             return generate_fallback_guidance(user, projects, assessments)
             
     except Exception as e:
-        logger.error(f"Personalized guidance failed: {e}")
+        logger.error("Personalized guidance failed: %s", e)
         return {"error": str(e), "status": "failed"}
 
 def parse_guidance_response(ai_text: str, user: Dict) -> Dict[str, Any]:
@@ -632,12 +818,14 @@ def generate_fallback_guidance(user: Dict, projects: List, assessments: List) ->
 async def generate_adaptive_questions(
     user_history: List[Dict],
     current_level: str,
-    question_count: int = 15,
+    question_count: Optional[int] = 15,
     gemini_model = None
 ) -> List[Dict]:
     """
     Generate personalized DevOps questions based on user history and current level
     """
+    if question_count is None:
+        question_count = 15
     try:
         # Analyze user's weak areas from history
         weak_areas = []
@@ -650,165 +838,84 @@ async def generate_adaptive_questions(
                 if score < 60:
                     weak_areas.append(category.lower())
         
-        # Comprehensive question bank for different levels and categories
-        question_bank = {
-            "advanced": [
-                {
-                    "category": "Culture",
-                    "question": "How does your organization approach post-incident reviews?",
-                    "options": ["No reviews", "Blame assignment", "Basic analysis", "Blameless postmortems", "Learning-focused retrospectives"],
-                    "focus": "culture_maturity"
-                },
-                {
-                    "category": "Automation", 
-                    "question": "How sophisticated is your Infrastructure as Code implementation?",
-                    "options": ["No IaC", "Basic scripts", "Templated infrastructure", "Immutable infrastructure", "Self-healing systems"],
-                    "focus": "infrastructure_automation"
-                },
-                {
-                    "category": "Monitoring",
-                    "question": "How comprehensive is your observability strategy?",
-                    "options": ["Basic logs", "Metrics + logs", "Distributed tracing", "Full observability", "Predictive monitoring"],
-                    "focus": "observability_maturity"
-                },
-                {
-                    "category": "Collaboration",
-                    "question": "How does your team handle cross-functional decision making?",
-                    "options": ["Siloed decisions", "Manager approval", "Team consensus", "Delegated authority", "Autonomous teams"],
-                    "focus": "team_autonomy"
-                },
-                {
-                    "category": "Delivery",
-                    "question": "What's your approach to feature flags and progressive deployment?",
-                    "options": ["No feature flags", "Basic toggles", "Targeted rollouts", "Canary deployments", "Advanced experimentation"],
-                    "focus": "deployment_sophistication"
-                },
-                {
-                    "category": "Culture",
-                    "question": "How does your organization approach learning from failures?",
-                    "options": ["Avoid discussion", "Assign blame", "Document lessons", "Systematic learning", "Failure celebration"],
-                    "focus": "learning_culture"
-                },
-                {
-                    "category": "Automation",
-                    "question": "How mature is your test automation strategy?",
-                    "options": ["Manual testing", "Unit tests", "Integration tests", "E2E automation", "AI-powered testing"],
-                    "focus": "testing_maturity"
-                },
-                {
-                    "category": "Monitoring",
-                    "question": "How proactive is your incident prevention approach?",
-                    "options": ["Reactive only", "Basic alerting", "Predictive alerts", "Chaos engineering", "Self-healing systems"],
-                    "focus": "reliability_engineering"
-                },
-                {
-                    "category": "Collaboration",
-                    "question": "How does your team approach knowledge sharing?",
-                    "options": ["Ad-hoc sharing", "Documentation", "Regular sessions", "Pair programming", "Communities of practice"],
-                    "focus": "knowledge_management"
-                },
-                {
-                    "category": "Delivery",
-                    "question": "How sophisticated is your deployment pipeline?",
-                    "options": ["Manual deployment", "Basic CI/CD", "Multi-stage pipeline", "Zero-downtime deployment", "Autonomous deployment"],
-                    "focus": "deployment_automation"
-                },
-                {
-                    "category": "Culture",
-                    "question": "How does your organization approach psychological safety?",
-                    "options": ["Not considered", "Aware but limited", "Actively building", "Strong foundation", "Exemplary culture"],
-                    "focus": "psychological_safety"
-                },
-                {
-                    "category": "Automation",
-                    "question": "How comprehensive is your security automation?",
-                    "options": ["Manual security", "Basic scanning", "Pipeline integration", "Continuous compliance", "Zero-trust automation"],
-                    "focus": "security_automation"
-                },
-                {
-                    "category": "Monitoring",
-                    "question": "How effective is your performance optimization process?",
-                    "options": ["No optimization", "Ad-hoc tuning", "Regular reviews", "Continuous optimization", "AI-driven optimization"],
-                    "focus": "performance_culture"
-                },
-                {
-                    "category": "Collaboration",
-                    "question": "How mature is your incident response coordination?",
-                    "options": ["Chaotic response", "Basic procedures", "Defined roles", "Well-orchestrated", "Self-organizing response"],
-                    "focus": "incident_coordination"
-                },
-                {
-                    "category": "Delivery",
-                    "question": "How data-driven is your product development approach?",
-                    "options": ["Assumption-based", "Basic analytics", "A/B testing", "Advanced experimentation", "ML-powered insights"],
-                    "focus": "data_driven_development"
-                }
-            ]
-        }
-        
         # Generate AI-enhanced questions if Gemini is available
         if gemini_model:
-            prompt = f"""
-            Generate {question_count} DevOps culture assessment questions for a {current_level} level practitioner.
-            
-            User's improvement areas based on history: {', '.join(weak_areas) if weak_areas else 'General assessment'}
-            
-            Please focus on:
-            - {current_level.title()} level concepts
-            - Areas needing improvement: {weak_areas}
-            - Mix of technical practices and cultural aspects
-            - 5-point scale options (worst to best)
-            
-            Return as JSON array with structure:
-            [{{
-                "category": "Collaboration|Automation|Monitoring|Culture|Delivery",
-                "question": "Clear question text",
-                "options": ["option1", "option2", "option3", "option4", "option5"],
-                "focus": "specific_area",
-                "difficulty": "{current_level}"
-            }}]
-            """
+            prompt = _ADAPTIVE_PROMPT_TMPL.substitute(
+                n=question_count,
+                level=current_level,
+                areas=', '.join(weak_areas) if weak_areas else 'general assessment',
+                schema=_QUESTION_SCHEMA_JSON
+            )
             
             try:
-                response = await gemini_model.generate_content_async(prompt)
-                ai_questions = json.loads(response.text)
-                logger.info(f"Generated {len(ai_questions)} AI-powered questions")
+                ai_questions = await _generate_json(gemini_model, prompt)
+                logger.info("Generated %s AI-powered questions", len(ai_questions))
                 return ai_questions
             except Exception as e:
-                logger.error(f"AI question generation failed: {e}")
+                logger.error("AI question generation failed: %s", e)
         
         # Fallback to predefined questions from question bank
-        available_questions = question_bank.get(current_level.lower(), question_bank["advanced"])
-        
-        # Select diverse questions, prioritizing weak areas if available
+        cache_key = (current_level, tuple(weak_areas), question_count)
+        cached = _FALLBACK_CACHE.get(cache_key)
+        if cached is not None:
+            return [q.copy() for q in cached]
+        
+        level = current_level.lower()
+        if level not in _QUESTION_BANK:
+            level = "advanced"
+        available_questions = _QUESTION_BANK[level]
+        questions_by_category = _QUESTION_INDEX[level]
+        
+        # Select diverse questions, prioritizing weak areas if available:
+        # up to 2 per weak area first, then fill remaining slots with other questions
+        weak_area_questions = (
+            q for area in weak_areas for q in questions_by_category.get(area, [])[:2]
+        )
         selected_questions = []
-        
-        # First, add questions from weak areas if user has history
-        if weak_areas:
-            for area in weak_areas:
-                area_questions = [q for q in available_questions if area.lower() in q["category"].lower()]
-                selected_questions.extend(area_questions[:2])  # Max 2 per weak area
-        
-        # Fill remaining slots with other questions
-        remaining_questions = [q for q in available_questions if q not in selected_questions]
-        selected_questions.extend(remaining_questions)
-        
-        # Format and limit to requested count
-        final_questions = []
-        for i, base_q in enumerate(selected_questions[:question_count]):
-            final_questions.append({
-                **base_q,
-                "id": f"adaptive_{i+1}",
-                "difficulty": current_level,
-                "personalized": True
-            })
-        
-        return final_questions
+        selected_keys = set()
+        for q in chain(weak_area_questions, available_questions):
+            if len(selected_questions) >= question_count:
+                break
+            key = (q["category"], q["focus"])
+            if key in selected_keys:
+                continue
+            selected_keys.add(key)
+            selected_questions.append(q)
+        
+        # Format the selected questions
+        final_questions = [None] * len(selected_questions)
+        for i, base_q in enumerate(selected_questions):
+            question = base_q.copy()
+            question["id"] = f"adaptive_{i+1}"
+            question["difficulty"] = current_level
+            question["personalized"] = True
+            final_questions[i] = question
+        
+        _FALLBACK_CACHE[cache_key] = tuple(final_questions)
+        return [q.copy() for q in final_questions]
         
     except Exception as e:
-        logger.error(f"Adaptive question generation failed: {e}")
+        logger.error("Adaptive question generation failed: %s", e)
         return []
 
+def _trend_stats(user_history: List[Dict]) -> tuple:
+    """Return (recent_change, overall_change) for a newest-first assessment history"""
+    # Only the newest, previous and oldest scores matter, so read them directly
+    newest = user_history[0].get("overall_score", 0)
+    recent_change = newest - user_history[1].get("overall_score", 0)
+    overall_change = newest - user_history[-1].get("overall_score", 0)
+    return recent_change, overall_change
+
+def _category_deltas(user_history: List[Dict]) -> Dict[str, float]:
+    """Change in each category score between the oldest and newest assessment"""
+    newest = user_history[0].get("category_scores", {})
+    oldest = user_history[-1].get("category_scores", {})
+    return {
+        category: float(score - oldest[category])
+        for category, score in newest.items()
+        if category in oldest
+    }
+
 async def analyze_progress_trends(
     user_history: List[Dict],
     gemini_model = None
@@ -825,49 +932,31 @@ async def analyze_progress_trends(
             }
         
         # Calculate trends
-        scores = [assessment.get("overall_score", 0) for assessment in user_history]
-        scores.reverse()  # Oldest to newest
+        recent_trend, overall_trend = _trend_stats(user_history)
         
-        # Simple trend analysis
-        if len(scores) >= 3:
-            recent_trend = scores[-1] - scores[-2]
-            overall_trend = scores[-1] - scores[0]
-        else:
-            recent_trend = scores[-1] - scores[0] 
-            overall_trend = recent_trend
+        # Strongest/weakest areas come straight from the category scores
+        category_deltas = _category_deltas(user_history)
+        focus_areas = {
+            "strongest_area": max(category_deltas, key=category_deltas.get) if category_deltas else None,
+            "weakest_area": min(category_deltas, key=category_deltas.get) if category_deltas else None
+        }
         
         # AI-powered trend analysis if available
         if gemini_model and len(user_history) >= 2:
-            prompt = f"""
-            Analyze this DevOps practitioner's progress over time:
-            
-            Assessment History (oldest to newest):
-            {json.dumps([{
+            history = orjson.dumps([{
                 'date': a.get('created_at', ''),
                 'score': a.get('overall_score', 0),
                 'level': a.get('maturity_level', ''),
                 'categories': a.get('category_scores', {})
-            } for a in reversed(user_history)], indent=2)}
-            
-            Provide analysis in JSON format:
-            {{
-                "trend_direction": "improving|declining|stable",
-                "progress_rate": "rapid|steady|slow",
-                "strongest_area": "category with most improvement", 
-                "weakest_area": "category needing attention",
-                "key_insights": ["insight1", "insight2", "insight3"],
-                "personalized_recommendations": ["rec1", "rec2", "rec3"],
-                "motivation_message": "encouraging message based on progress"
-            }}
-            """
+            } for a in reversed(user_history)]).decode()
+            prompt = _TRENDS_PROMPT_TMPL.substitute(history=history, schema=_TRENDS_SCHEMA_JSON)
             
             try:
-                response = await gemini_model.generate_content_async(prompt)
-                ai_analysis = json.loads(response.text)
+                ai_analysis = await _generate_json(gemini_model, prompt)
                 logger.info("Generated AI-powered progress analysis")
-                return ai_analysis
+                return {**ai_analysis, **focus_areas}
             except Exception as e:
-                logger.error(f"AI trend analysis failed: {e}")
+                logger.error("AI trend analysis failed: %s", e)
         
         # Fallback analysis
         if recent_trend > 5:
@@ -886,11 +975,12 @@ async def analyze_progress_trends(
             "overall_change": round(overall_trend, 1),
             "message": message,
             "assessment_count": len(user_history),
-            "progress_rate": "steady" if abs(recent_trend) < 10 else "rapid"
+            "progress_rate": "steady" if abs(recent_trend) < 10 else "rapid",
+            **focus_areas
         }
         
     except Exception as e:
-        logger.error(f"Progress trend analysis failed: {e}")
+        logger.error("Progress trend analysis failed: %s", e)
         return {
             "trend": "analysis_failed",
             "message": "Unable to analyze progress trends",
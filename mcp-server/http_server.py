@@ -2,11 +2,16 @@
 HTTP Server wrapper for MCP DevOps Tools
 Provides REST API endpoints for DevOps culture assessment
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError
 from typing import Dict, Any, List, Optional
+from hashlib import blake2b
+import asyncio
 import logging
+import orjson
 import uvicorn
 from devops_culture_tools import (
     devops_culture_assessment,
@@ -17,56 +22,214 @@ from devops_culture_tools import (
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+from config import config
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini AI
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-pro')
-else:
-    print("⚠️  GEMINI_API_KEY not found in environment variables")
-    model = None
+class GeminiLimiter:
+    """Wraps a Gemini model so at most max_in_flight requests run at once"""
+    
+    def __init__(self, gemini_model, max_in_flight: int = 8):
+        self.gemini_model = gemini_model
+        # ~500 requests/minute per API key leaves room for about 8 in flight
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+    
+    async def generate_content_async(self, prompt, **kwargs):
+        """Drop-in replacement for GenerativeModel.generate_content_async"""
+        async with self._semaphore:
+            return await self.gemini_model.generate_content_async(prompt, **kwargs)
 
-app = FastAPI(title="MCP DevOps Culture API", version="1.0.0")
+# Gemini model and its concurrency-limited wrapper, created per worker process
+# in the startup hook
+model = None
+limited_model: Optional[GeminiLimiter] = None
 
-# Add CORS middleware
+app = FastAPI(
+    title="MCP DevOps Culture API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# Add CORS middleware. Credentials stay off: browsers reject credentialed
+# requests to a wildcard origin anyway. Preflights are cached for a day.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_credentials=False,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
+    max_age=86400,
 )
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(
+    level=logging.WARNING if os.getenv("ENV") == "prod" else logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
 logger = logging.getLogger("mcp-devops-api")
 
+# GET endpoints whose responses carry an ETag and honour If-None-Match
+_ETAG_PATHS = frozenset({"/"})
+
+def _etag(data: bytes) -> str:
+    return f'W/"{blake2b(data, digest_size=16).hexdigest()}"'
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    """Tag cacheable GET responses and answer matching revalidations with 304"""
+    response = await call_next(request)
+    if request.method != "GET" or request.url.path not in _ETAG_PATHS or response.status_code != 200:
+        return response
+    
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = _etag(body)
+    headers = dict(response.headers)
+    headers["ETag"] = etag
+    if request.headers.get("if-none-match") == etag:
+        # Keep CORS and caching headers on the 304, minus the body's own
+        for name in ("content-length", "content-type"):
+            headers.pop(name, None)
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+@app.on_event("startup")
+async def configure_gemini():
+    """Configure Gemini AI in each worker so forked workers don't share gRPC channels"""
+    global model, limited_model
+    api_key = os.getenv("GEMINI_API_KEY")
+    if api_key:
+        # Async gRPC transport keeps one long-lived HTTP/2 channel per worker
+        genai.configure(
+            api_key=api_key,
+            transport="grpc_asyncio",
+            client_options={"api_endpoint": "generativelanguage.googleapis.com"}
+        )
+        model = genai.GenerativeModel(config.gemini_model)
+        limited_model = GeminiLimiter(model)
+    else:
+        print("⚠️  GEMINI_API_KEY not found in environment variables")
+        model = None
+
+@app.on_event("startup")
+async def warm_up():
+    """Pay first-request costs (validators, Gemini channel handshake) at boot"""
+    if os.getenv("WARMUP", "1") != "1":
+        return
+    
+    AssessmentRequest.model_validate({"user_id": "_", "assessment_responses": {}})
+    QuestionRequest.model_validate({"user_id": "_", "user_history": [], "current_level": "advanced"})
+    if model:
+        try:
+            await asyncio.wait_for(model.generate_content_async("ping"), timeout=2)
+        except Exception as e:
+            logger.warning("Gemini warm-up failed: %s", e)
+
+def get_model():
+    """Dependency returning the shared Gemini model (override in tests)"""
+    return model
+
+def get_limited_model():
+    """Dependency returning the concurrency-limited Gemini wrapper"""
+    return limited_model
+
 # Pydantic models
 class AssessmentRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     user_id: str
     assessment_responses: Dict[str, int]
-    user_history: Optional[List[Dict]] = []
+    user_history: Optional[List[Dict[str, Any]]] = []
     analysis_type: Optional[str] = "comprehensive"
 
 class QuestionRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     user_id: str
-    user_history: List[Dict]
+    user_history: List[Dict[str, Any]]
     current_level: str
     question_count: Optional[int] = 15
 
 class GuidanceRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     user_id: str
     assessment_result: Dict[str, Any]
 
 class RoadmapRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     user_id: str
     assessment_id: str
     current_scores: Dict[str, int]
 
+def json_body(model_cls):
+    """Dependency parsing the raw request body directly into model_cls
+    
+    pydantic-core decodes and validates the JSON bytes in one pass, skipping
+    the intermediate json.loads dict that FastAPI's default body handling builds.
+    """
+    async def parse(request: Request):
+        try:
+            return model_cls.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+            )
+    return parse
+
+def json_body_schema(model_cls) -> Dict[str, Any]:
+    """openapi_extra documenting a json_body(model_cls) request body
+    
+    The body is read by a dependency rather than a typed parameter, so FastAPI
+    can't infer it; without this /docs and generated clients see no body.
+    """
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model_cls.model_json_schema()}}
+        }
+    }
+
+# Static transformation roadmap shared by every /devops/roadmap response
+_ROADMAP_TEMPLATE = {
+    "phases": [
+        {
+            "phase": 1,
+            "name": "Foundation Building",
+            "duration": "4-6 weeks",
+            "focus_areas": ["Basic automation", "Team collaboration"],
+            "milestones": ["CI/CD pipeline setup", "Daily standups established"]
+        },
+        {
+            "phase": 2, 
+            "name": "Process Optimization",
+            "duration": "6-8 weeks",
+            "focus_areas": ["Monitoring", "Testing automation"],
+            "milestones": ["Comprehensive monitoring", "Automated testing pipeline"]
+        }
+    ],
+    "estimated_duration": "3-4 months",
+    "success_metrics": ["Deployment frequency", "Lead time", "MTTR"]
+}
+
+async def _stream_roadmap(roadmap_id: str):
+    """Yield the roadmap as newline-delimited JSON, one phase per line"""
+    yield orjson.dumps({"roadmap_id": roadmap_id}) + b"\n"
+    for phase in _ROADMAP_TEMPLATE["phases"]:
+        yield orjson.dumps({"phase": phase}) + b"\n"
+    yield orjson.dumps({
+        "estimated_duration": _ROADMAP_TEMPLATE["estimated_duration"],
+        "success_metrics": _ROADMAP_TEMPLATE["success_metrics"]
+    }) + b"\n"
+
+@app.options("/{path:path}")
+async def options_fallback():
+    """Answer non-CORS OPTIONS requests without touching an endpoint"""
+    return Response(status_code=204)
+
 @app.get("/")
 async def root():
     return {
@@ -76,13 +239,16 @@ async def root():
         "gemini_configured": model is not None
     }
 
-@app.post("/devops/assess")
-async def assess_devops_culture(request: AssessmentRequest):
+@app.post("/devops/assess", openapi_extra=json_body_schema(AssessmentRequest))
+async def assess_devops_culture(
+    request: AssessmentRequest = Depends(json_body(AssessmentRequest)),
+    gemini_model=Depends(get_model)
+):
     """
     🤖 AI-Powered DevOps Culture Assessment using Gemini
     """
     try:
-        logger.info(f"Starting DevOps assessment for user: {request.user_id}")
+        logger.info("Starting DevOps assessment for user: %s", request.user_id)
         
         # Prepare assessment context
         assessment_context = {
@@ -99,65 +265,78 @@ async def assess_devops_culture(request: AssessmentRequest):
         result = await devops_culture_assessment(
             assessment_context=assessment_context,
             analysis_type=request.analysis_type,
-            gemini_model=model
+            gemini_model=gemini_model
         )
         
-        logger.info(f"Assessment completed for user: {request.user_id}")
+        logger.info("Assessment completed for user: %s", request.user_id)
         return result
         
     except Exception as e:
-        logger.error(f"Assessment failed: {e}")
+        logger.error("Assessment failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Assessment failed: {str(e)}")
 
-@app.post("/devops/generate-questions")
-async def generate_personalized_questions(request: QuestionRequest):
+@app.post("/devops/generate-questions", openapi_extra=json_body_schema(QuestionRequest))
+async def generate_personalized_questions(
+    request: QuestionRequest = Depends(json_body(QuestionRequest)),
+    gemini_model=Depends(get_limited_model)
+):
     """
     Generate personalized DevOps questions based on user history and level
     """
     try:
-        logger.info(f"Generating personalized questions for user: {request.user_id}")
+        logger.info("Generating personalized questions for user: %s", request.user_id)
         
         # Call the question generation tool
         questions = await generate_adaptive_questions(
             user_history=request.user_history,
             current_level=request.current_level,
             question_count=request.question_count,
-            gemini_model=model
+            gemini_model=gemini_model
         )
         
         return {"questions": questions}
         
     except Exception as e:
-        logger.error(f"Question generation failed: {e}")
+        logger.error("Question generation failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Question generation failed: {str(e)}")
 
-@app.post("/devops/guidance")
-async def get_personalized_guidance(request: GuidanceRequest):
+@app.post("/devops/guidance", openapi_extra=json_body_schema(GuidanceRequest))
+async def get_personalized_guidance(
+    request: GuidanceRequest = Depends(json_body(GuidanceRequest)),
+    gemini_model=Depends(get_limited_model)
+):
     """
     Get AI-powered personalized DevOps guidance
     """
     try:
-        logger.info(f"Generating personalized guidance for user: {request.user_id}")
+        logger.info("Generating personalized guidance for user: %s", request.user_id)
         
         # Call the guidance tool
         guidance = await personalized_devops_guidance(
             assessment_result=request.assessment_result,
-            gemini_model=model
+            gemini_model=gemini_model
         )
         
         return guidance
         
     except Exception as e:
-        logger.error(f"Guidance generation failed: {e}")
+        logger.error("Guidance generation failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Guidance generation failed: {str(e)}")
 
-@app.post("/devops/roadmap")
-async def generate_transformation_roadmap(request: RoadmapRequest):
+@app.post("/devops/roadmap", openapi_extra=json_body_schema(RoadmapRequest))
+async def generate_transformation_roadmap(
+    http_request: Request,
+    request: RoadmapRequest = Depends(json_body(RoadmapRequest))
+):
     """
     Generate AI-powered transformation roadmap
+    
+    Clients sending `Accept: application/x-ndjson` receive the roadmap as a
+    stream of JSON lines (header, one line per phase, summary) so they can
+    render phases progressively.
     """
     try:
-        logger.info(f"Generating transformation roadmap for user: {request.user_id}")
+        logger.info("Generating transformation roadmap for user: %s", request.user_id)
         
         # Create roadmap context
         roadmap_context = {
@@ -168,34 +347,30 @@ async def generate_transformation_roadmap(request: RoadmapRequest):
         
         # For now, generate a structured roadmap
         # This should call a dedicated roadmap generation function
-        roadmap = {
-            "roadmap_id": f"roadmap_{request.assessment_id}",
-            "phases": [
-                {
-                    "phase": 1,
-                    "name": "Foundation Building",
-                    "duration": "4-6 weeks",
-                    "focus_areas": ["Basic automation", "Team collaboration"],
-                    "milestones": ["CI/CD pipeline setup", "Daily standups established"]
-                },
-                {
-                    "phase": 2, 
-                    "name": "Process Optimization",
-                    "duration": "6-8 weeks",
-                    "focus_areas": ["Monitoring", "Testing automation"],
-                    "milestones": ["Comprehensive monitoring", "Automated testing pipeline"]
-                }
-            ],
-            "estimated_duration": "3-4 months",
-            "success_metrics": ["Deployment frequency", "Lead time", "MTTR"]
-        }
+        roadmap_id = f"roadmap_{request.assessment_id}"
+        if "application/x-ndjson" in http_request.headers.get("accept", ""):
+            return StreamingResponse(
+                _stream_roadmap(roadmap_id),
+                media_type="application/x-ndjson"
+            )
         
-        return roadmap
+        # Tag the serialized body so the ETag changes whenever the roadmap
+        # does. This is a POST, so If-None-Match never turns it into a 304.
+        body = orjson.dumps({"roadmap_id": roadmap_id, **_ROADMAP_TEMPLATE})
+        return Response(content=body, media_type="application/json", headers={"ETag": _etag(body)})
         
     except Exception as e:
-        logger.error(f"Roadmap generation failed: {e}")
+        logger.error("Roadmap generation failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Roadmap generation failed: {str(e)}")
 
 if __name__ == "__main__":
     # Run the HTTP server
-    uvicorn.run(app, host="0.0.0.0", port=3001, log_level="info")
+    uvicorn.run(
+        "http_server:app",
+        host="0.0.0.0",
+        port=3001,
+        loop="auto",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+        log_level="info"
+    )
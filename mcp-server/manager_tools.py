@@ -2,35 +2,42 @@
 MCP Manager Tool Implementations for Team Leadership Features
 """
 import asyncio
-import json
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
 
+from tool_context import ToolContext
 
-async def team_collaboration_insights(
-    self, repository: str, user_id: str, team_size: Optional[int] = None
-) -> Dict:
-    """Team collaboration analysis for managers"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role != 'manager':
-            return {
-                "error": "Access denied. This feature is only available for Manager users."
-            }
-        
-        repo_context = await self.get_repository_context(repository, user_id)
-        
-        context = {
-            "user_role": user_context.role,
-            "repository": repository,
-            "team_size": team_size,
-            "repository_analysis": repo_context
-        }
-        
-        prompt = f"""
+# Roles allowed to use the manager tools
+_MGR_ROLES = frozenset({'manager'})
+
+# Upper bound on concurrent repository-context fetches per tool call
+_REPO_FETCH_CONCURRENCY = 10
+
+
+async def _fetch_repository_contexts(self, repositories: List[str], user_id: str) -> List[Dict]:
+    """Fetch analyses for several repositories concurrently"""
+    semaphore = asyncio.Semaphore(_REPO_FETCH_CONCURRENCY)
+    
+    async def fetch(repo):
+        async with semaphore:
+            return await self.get_repository_context(repo, user_id)
+    
+    results = await asyncio.gather(
+        *(fetch(repo) for repo in repositories), return_exceptions=True
+    )
+    return [
+        {"repository": repo, "analysis": context}
+        for repo, context in zip(repositories, results)
+        if context and not isinstance(context, Exception)
+    ]
+
+
+
+_COLLAB_PROMPT = """
 You are a team leadership and collaboration expert advising a manager.
 
 Repository: {repository}
-Team Size: {team_size or "Not specified"}
+Team Size: {team_size}
 
 Based on the repository analysis, provide insights on:
 
@@ -71,51 +78,12 @@ Based on the repository analysis, provide insights on:
 
 Provide specific, data-driven insights with actionable recommendations for team leadership.
 """
-        
-        ai_response = await self.call_gemini(prompt, context)
-        
-        return {
-            "tool": "team_collaboration_insights",
-            "repository": repository,
-            "analysis": ai_response
-        }
-        
-    except Exception as e:
-        return {"error": f"Error in team collaboration insights: {str(e)}"}
 
 
-async def team_learning_analysis(
-    self, user_id: str, repositories: Optional[List[str]] = None
-) -> Dict:
-    """Team learning patterns analysis for managers"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role != 'manager':
-            return {
-                "error": "Access denied. This feature is only available for Manager users."
-            }
-        
-        # If no repositories specified, try to get user's repositories
-        if not repositories:
-            repositories = ["primary-repository"]  # Fallback
-        
-        # Get context for all repositories
-        repo_contexts = []
-        for repo in repositories:
-            context = await self.get_repository_context(repo, user_id)
-            if context:
-                repo_contexts.append({"repository": repo, "analysis": context})
-        
-        context = {
-            "user_role": user_context.role,
-            "repositories": repositories,
-            "repository_analyses": repo_contexts
-        }
-        
-        prompt = f"""
+_LEARNING_PROMPT = """
 You are a learning and development strategist for technical teams, advising a manager.
 
-Team Repositories: {', '.join(repositories)}
+Team Repositories: {repositories}
 
 Based on the repository analyses, provide a comprehensive team learning assessment:
 
@@ -163,40 +131,9 @@ Based on the repository analyses, provide a comprehensive team learning assessme
 
 Provide actionable insights for developing a high-performing technical team.
 """
-        
-        ai_response = await self.call_gemini(prompt, context)
-        
-        return {
-            "tool": "team_learning_analysis",
-            "repositories": repositories,
-            "analysis": ai_response
-        }
-        
-    except Exception as e:
-        return {"error": f"Error in team learning analysis: {str(e)}"}
 
 
-async def project_health_overview(
-    self, repository: str, user_id: str, timeframe: str = "30d"
-) -> Dict:
-    """Comprehensive project health assessment for managers"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role != 'manager':
-            return {
-                "error": "Access denied. This feature is only available for Manager users."
-            }
-        
-        repo_context = await self.get_repository_context(repository, user_id)
-        
-        context = {
-            "user_role": user_context.role,
-            "repository": repository,
-            "timeframe": timeframe,
-            "repository_analysis": repo_context
-        }
-        
-        prompt = f"""
+_HEALTH_PROMPT = """
 You are a technical project management expert providing a comprehensive health assessment.
 
 Repository: {repository}
@@ -254,54 +191,13 @@ Provide a detailed project health overview covering:
 
 Provide a comprehensive, data-driven assessment suitable for executive reporting.
 """
-        
-        ai_response = await self.call_gemini(prompt, context)
-        
-        return {
-            "tool": "project_health_overview",
-            "repository": repository,
-            "timeframe": timeframe,
-            "analysis": ai_response
-        }
-        
-    except Exception as e:
-        return {"error": f"Error in project health overview: {str(e)}"}
 
 
-async def resource_allocation_suggestions(
-    self, user_id: str, team_repositories: Optional[List[str]] = None, 
-    upcoming_projects: Optional[str] = None
-) -> Dict:
-    """Resource allocation and capacity planning for managers"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role != 'manager':
-            return {
-                "error": "Access denied. This feature is only available for Manager users."
-            }
-        
-        if not team_repositories:
-            team_repositories = ["primary-repository"]  # Fallback
-        
-        # Get context for all team repositories
-        repo_contexts = []
-        for repo in team_repositories:
-            context = await self.get_repository_context(repo, user_id)
-            if context:
-                repo_contexts.append({"repository": repo, "analysis": context})
-        
-        context = {
-            "user_role": user_context.role,
-            "team_repositories": team_repositories,
-            "upcoming_projects": upcoming_projects,
-            "repository_analyses": repo_contexts
-        }
-        
-        prompt = f"""
+_RESOURCE_PROMPT = """
 You are a technical resource planning and capacity management expert for engineering teams.
 
-Team Repositories: {', '.join(team_repositories)}
-Upcoming Projects: {upcoming_projects or "Not specified"}
+Team Repositories: {team_repositories}
+Upcoming Projects: {upcoming_projects}
 
 Based on the current team performance and project analysis, provide:
 
@@ -355,47 +251,14 @@ Based on the current team performance and project analysis, provide:
 
 Provide specific, actionable recommendations for maximizing team effectiveness and project success.
 """
-        
-        ai_response = await self.call_gemini(prompt, context)
-        
-        return {
-            "tool": "resource_allocation_suggestions",
-            "team_repositories": team_repositories,
-            "upcoming_projects": upcoming_projects,
-            "analysis": ai_response
-        }
-        
-    except Exception as e:
-        return {"error": f"Error in resource allocation suggestions: {str(e)}"}
 
 
-async def project_risk_assessment(
-    self, repository: str, user_id: str, project_stage: str = "active", team_size: Optional[int] = None
-) -> Dict:
-    """Advanced project risk assessment and mitigation strategies for managers"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role != 'manager':
-            return {
-                "error": "Access denied. This feature is only available for Manager users."
-            }
-        
-        repo_context = await self.get_repository_context(repository, user_id)
-        
-        context = {
-            "user_role": user_context.role,
-            "repository": repository,
-            "project_stage": project_stage,
-            "team_size": team_size,
-            "repository_analysis": repo_context
-        }
-        
-        prompt = f"""
+_RISK_PROMPT = """
 You are a senior project risk management consultant advising a development team manager.
 
 Repository: {repository}
 Project Stage: {project_stage}
-Team Size: {team_size or "Not specified"}
+Team Size: {team_size}
 
 Conduct a comprehensive risk assessment covering:
 
@@ -443,50 +306,16 @@ Conduct a comprehensive risk assessment covering:
 
 Provide specific, actionable risk mitigation recommendations with estimated effort and impact.
 """
-        
-        ai_response = await self.call_gemini(prompt, context)
-        
-        return {
-            "tool": "project_risk_assessment",
-            "repository": repository,
-            "project_stage": project_stage,
-            "risk_assessment": ai_response,
-            "preview": f"Risk Assessment for {repository}: Identified {len(ai_response.split('Risk:')) - 1} potential risk areas with prioritized mitigation strategies."
-        }
-        
-    except Exception as e:
-        return {"error": f"Error in project risk assessment: {str(e)}"}
 
 
-async def team_performance_optimization(
-    self, user_id: str, team_metrics: Dict, team_size: Optional[int] = None
-) -> Dict:
-    """AI-powered team performance optimization recommendations"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role != 'manager':
-            return {
-                "error": "Access denied. This feature is only available for Manager users."
-            }
-        
-        context = {
-            "user_role": user_context.role,
-            "team_metrics": team_metrics,
-            "team_size": team_size
-        }
-        
-        velocity = team_metrics.get('velocity', 0)
-        quality = team_metrics.get('quality', 0)
-        collaboration = team_metrics.get('collaboration', 0)
-        
-        prompt = f"""
+_PERFORMANCE_PROMPT = """
 You are an elite team performance consultant specializing in software development teams.
 
 Team Performance Metrics:
 - Velocity: {velocity}%
 - Code Quality: {quality}%
 - Team Collaboration: {collaboration}%
-- Team Size: {team_size or "Not specified"}
+- Team Size: {team_size}
 
 Provide comprehensive optimization recommendations:
 
@@ -540,15 +369,184 @@ Provide comprehensive optimization recommendations:
 
 Focus on practical, measurable improvements that directly impact team productivity and job satisfaction.
 """
-        
-        ai_response = await self.call_gemini(prompt, context)
-        
+
+
+@dataclass(frozen=True)
+class ManagerTool:
+    """How a manager tool builds its prompt and shapes its result"""
+    prompt: str
+    error_label: str
+    echo: Tuple[str, ...]  # parameters copied into the result
+    result_key: str = "analysis"
+    repos_param: Optional[str] = None  # list parameter for multi-repository tools
+    extra_params: Optional[Callable[[Dict], Dict]] = None
+    preview: Optional[Callable[[Dict, str], str]] = None
+
+
+MANAGER_TOOLS: Dict[str, ManagerTool] = {
+    "team_collaboration_insights": ManagerTool(
+        prompt=_COLLAB_PROMPT,
+        error_label="team collaboration insights",
+        echo=("repository",)
+    ),
+    "team_learning_analysis": ManagerTool(
+        prompt=_LEARNING_PROMPT,
+        error_label="team learning analysis",
+        echo=("repositories",),
+        repos_param="repositories"
+    ),
+    "project_health_overview": ManagerTool(
+        prompt=_HEALTH_PROMPT,
+        error_label="project health overview",
+        echo=("repository", "timeframe")
+    ),
+    "resource_allocation_suggestions": ManagerTool(
+        prompt=_RESOURCE_PROMPT,
+        error_label="resource allocation suggestions",
+        echo=("team_repositories", "upcoming_projects"),
+        repos_param="team_repositories"
+    ),
+    "project_risk_assessment": ManagerTool(
+        prompt=_RISK_PROMPT,
+        error_label="project risk assessment",
+        echo=("repository", "project_stage"),
+        result_key="risk_assessment",
+        preview=lambda p, response: (
+            f"Risk Assessment for {p['repository']}: Identified {response.count('Risk:')} "
+            f"potential risk areas with prioritized mitigation strategies."
+        )
+    ),
+    "team_performance_optimization": ManagerTool(
+        prompt=_PERFORMANCE_PROMPT,
+        error_label="team performance optimization",
+        echo=("team_metrics",),
+        result_key="optimization_analysis",
+        extra_params=lambda p: {
+            "velocity": p["team_metrics"].get('velocity', 0),
+            "quality": p["team_metrics"].get('quality', 0),
+            "collaboration": p["team_metrics"].get('collaboration', 0)
+        },
+        preview=lambda p, response: (
+            f"Team Performance Analysis: Generated optimization recommendations targeting "
+            f"{p['velocity']}% velocity, {p['quality']}% quality, and {p['collaboration']}% collaboration metrics."
+        )
+    ),
+}
+
+
+def _prompt_params(params: Dict) -> Dict:
+    """Render tool parameters the way the prompt templates expect them"""
+    rendered = {}
+    for key, value in params.items():
+        if value is None:
+            value = "Not specified"
+        elif isinstance(value, list):
+            value = ', '.join(value) or "No repositories available"
+        rendered[key] = value
+    return rendered
+
+
+async def _run_manager_tool(self, tool_name: str, user_id: str, **params) -> Dict:
+    """Shared role check, context fetch, prompt and Gemini call for manager tools"""
+    spec = MANAGER_TOOLS[tool_name]
+    repository = params.get("repository")
+    if repository is not None:
+        user_context, repo_context = await self._authorize_and_fetch(user_id, repository, _MGR_ROLES)
+    else:
+        user_context = await self.get_user_context(user_id)
+        if user_context and user_context.role not in _MGR_ROLES:
+            user_context = None
+    if not user_context:
         return {
-            "tool": "team_performance_optimization",
-            "team_metrics": team_metrics,
-            "optimization_analysis": ai_response,
-            "preview": f"Team Performance Analysis: Generated optimization recommendations targeting {velocity}% velocity, {quality}% quality, and {collaboration}% collaboration metrics."
+            "error": "Access denied. This feature is only available for Manager users."
         }
-        
+    
+    if spec.repos_param and not params[spec.repos_param]:
+        # If no repositories specified, use the ones the user has connected
+        params[spec.repos_param] = await self.get_user_repositories(user_id)
+    
+    context = ToolContext(user_role=user_context.role, **params)
+    if repository is not None:
+        context.repository_analysis = repo_context
+    elif spec.repos_param:
+        repositories = params[spec.repos_param]
+        context.repository_analyses = (
+            await _fetch_repository_contexts(self, repositories, user_id) if repositories else []
+        )
+    
+    try:
+        prompt_params = _prompt_params(params)
+        if spec.extra_params:
+            prompt_params.update(spec.extra_params(params))
+        prompt = spec.prompt.format_map(prompt_params)
+        ai_response = await self.call_gemini(prompt, context)
     except Exception as e:
-        return {"error": f"Error in team performance optimization: {str(e)}"}
+        return {"error": f"Error in {spec.error_label}: {str(e)}"}
+    
+    result = {"tool": tool_name}
+    for key in spec.echo:
+        result[key] = params[key]
+    result[spec.result_key] = ai_response
+    if spec.preview:
+        result["preview"] = spec.preview(prompt_params, ai_response)
+    return result
+
+
+async def team_collaboration_insights(
+    self, repository: str, user_id: str, team_size: Optional[int] = None
+) -> Dict:
+    """Team collaboration analysis for managers"""
+    return await _run_manager_tool(
+        self, "team_collaboration_insights", user_id,
+        repository=repository, team_size=team_size
+    )
+
+
+async def team_learning_analysis(
+    self, user_id: str, repositories: Optional[List[str]] = None
+) -> Dict:
+    """Team learning patterns analysis for managers"""
+    return await _run_manager_tool(
+        self, "team_learning_analysis", user_id, repositories=repositories
+    )
+
+
+async def project_health_overview(
+    self, repository: str, user_id: str, timeframe: str = "30d"
+) -> Dict:
+    """Comprehensive project health assessment for managers"""
+    return await _run_manager_tool(
+        self, "project_health_overview", user_id,
+        repository=repository, timeframe=timeframe
+    )
+
+
+async def resource_allocation_suggestions(
+    self, user_id: str, team_repositories: Optional[List[str]] = None, 
+    upcoming_projects: Optional[str] = None
+) -> Dict:
+    """Resource allocation and capacity planning for managers"""
+    return await _run_manager_tool(
+        self, "resource_allocation_suggestions", user_id,
+        team_repositories=team_repositories, upcoming_projects=upcoming_projects
+    )
+
+
+async def project_risk_assessment(
+    self, repository: str, user_id: str, project_stage: str = "active", team_size: Optional[int] = None
+) -> Dict:
+    """Advanced project risk assessment and mitigation strategies for managers"""
+    return await _run_manager_tool(
+        self, "project_risk_assessment", user_id,
+        repository=repository, project_stage=project_stage, team_size=team_size
+    )
+
+
+async def team_performance_optimization(
+    self, user_id: str, team_metrics: Dict, team_size: Optional[int] = None
+) -> Dict:
+    """AI-powered team performance optimization recommendations"""
+    return await _run_manager_tool(
+        self, "team_performance_optimization", user_id,
+        team_metrics=team_metrics, team_size=team_size
+    )
@@ -0,0 +1,68 @@
+"""
+Shared helpers for the Meridian test scripts and their pytest fixtures
+
+Every conftest hands out the same event loop, MCP server and HTTP client from
+here, so a pytest session builds each of them once however many conftest
+files expose the fixtures.
+"""
+import asyncio
+import sys
+from typing import Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_http_client = None
+
+
+def run(coro):
+    """Run a script's coroutine on uvloop when it is installed, else the default loop"""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+    return uvloop.run(coro)
+
+
+def session_loop() -> asyncio.AbstractEventLoop:
+    """The single event loop all test coroutines run on"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+def shared_server():
+    """The MCP server instance that server.py already builds at import"""
+    from server import mcp_server
+    return mcp_server
+
+
+def shared_http_client():
+    """Pooled client for backend probes"""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=8)
+        )
+    return _http_client
+
+
+async def aclose_shared():
+    """Close the shared client and server on the loop that is running them"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if "server" in sys.modules:
+        await sys.modules["server"].mcp_server.aclose()
+
+
+def close_session():
+    """Close the shared client, server and loop; safe to call more than once"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        return
+    _loop.run_until_complete(aclose_shared())
+    _loop.close()
+    _loop = None
@@ -1,45 +1,26 @@
 """
 MCP Tool Implementations for Meridian Professional and Manager Features
 """
-import asyncio
-import json
-from typing import Any, Dict, List, Optional
+from typing import Optional
 
-from mcp.types import CallToolRequest, CallToolResult, TextContent
+from mcp.types import CallToolResult, TextContent
 
+from tool_context import ToolContext
+
+# Roles allowed to use the professional tools
+_PRO_ROLES = frozenset({'professional', 'manager'})
+
+# Shared deny result; call_tool passes tool results through without mutating them
+_ACCESS_DENIED = CallToolResult(
+    content=[TextContent(
+        type="text",
+        text="Access denied. This feature is only available for Professional and Manager users."
+    )]
+)
 
-async def advanced_troubleshooting(
-    self, repository: str, user_id: str, issue_description: str
-) -> CallToolResult:
-    """Advanced AI-powered troubleshooting for professionals"""
-    try:
-        # Get user context and verify role
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role not in ['professional', 'manager']:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text", 
-                    text="Access denied. This feature is only available for Professional and Manager users."
-                )]
-            )
-        
-        # Get repository analysis context
-        repo_context = await self.get_repository_context(repository, user_id)
-        
-        # Prepare context for Gemini
-        context = {
-            "user_role": user_context.role,
-            "repository": repository,
-            "issue": issue_description,
-            "repository_analysis": repo_context,
-            "user_profile": {
-                "github_username": user_context.github_username,
-                "email": user_context.email
-            }
-        }
-        
-        prompt = f"""
-You are an expert software engineering troubleshooter helping a {user_context.role} user.
+
+_TROUBLESHOOTING_PROMPT = """
+You are an expert software engineering troubleshooter helping a {role} user.
 
 Issue Description: {issue_description}
 Repository: {repository}
@@ -53,18 +34,41 @@ Based on the repository analysis and issue description, provide:
 5. **Tool Recommendations**: Specific tools or libraries that could help
 6. **Code Examples**: If applicable, provide code snippets for fixes
 
-Format your response as a structured troubleshooting guide that a {user_context.role} can follow.
+Format your response as a structured troubleshooting guide that a {role} can follow.
 """
-        
+
+
+async def advanced_troubleshooting(
+    self, repository: str, user_id: str, issue_description: str
+) -> CallToolResult:
+    """Advanced AI-powered troubleshooting for professionals"""
+    # Verify role while fetching repository analysis context
+    user_context, repo_context = await self._authorize_and_fetch(
+        user_id, repository, _PRO_ROLES
+    )
+    if not user_context:
+        return _ACCESS_DENIED
+    
+    # Prepare context for Gemini
+    context = ToolContext(
+        user_role=user_context.role,
+        repository=repository,
+        issue=issue_description,
+        repository_analysis=repo_context,
+        user_profile={
+            "github_username": user_context.github_username,
+            "email": user_context.email
+        }
+    )
+    
+    prompt = _TROUBLESHOOTING_PROMPT.format_map({
+        "role": user_context.role,
+        "issue_description": issue_description,
+        "repository": repository
+    })
+    
+    try:
         ai_response = await self.call_gemini(prompt, context)
-        
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"# Advanced Troubleshooting Guide\n\n{ai_response}"
-            )]
-        )
-        
     except Exception as e:
         return CallToolResult(
             content=[TextContent(
@@ -72,36 +76,20 @@ Format your response as a structured troubleshooting guide that a {user_context.
                 text=f"Error in advanced troubleshooting: {str(e)}"
             )]
         )
+    
+    return CallToolResult(
+        content=[TextContent(
+            type="text",
+            text=f"# Advanced Troubleshooting Guide\n\n{ai_response}"
+        )]
+    )
 
 
-async def performance_optimization(
-    self, repository: str, user_id: str, focus_area: Optional[str] = None
-) -> CallToolResult:
-    """Performance optimization recommendations for professionals"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role not in ['professional', 'manager']:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text="Access denied. This feature is only available for Professional and Manager users."
-                )]
-            )
-        
-        repo_context = await self.get_repository_context(repository, user_id)
-        
-        context = {
-            "user_role": user_context.role,
-            "repository": repository,
-            "focus_area": focus_area,
-            "repository_analysis": repo_context
-        }
-        
-        prompt = f"""
-You are a performance optimization expert helping a {user_context.role} user optimize their codebase.
+_PERFORMANCE_PROMPT = """
+You are a performance optimization expert helping a {role} user optimize their codebase.
 
 Repository: {repository}
-Focus Area: {focus_area or "General performance optimization"}
+Focus Area: {focus_area}
 
 Based on the repository analysis, provide:
 
@@ -113,18 +101,35 @@ Based on the repository analysis, provide:
 6. **Implementation Priority**: Which optimizations to tackle first
 7. **Performance Testing**: How to measure improvements
 
-Focus on actionable, measurable improvements that a {user_context.role} can implement.
+Focus on actionable, measurable improvements that a {role} can implement.
 """
-        
+
+
+async def performance_optimization(
+    self, repository: str, user_id: str, focus_area: Optional[str] = None
+) -> CallToolResult:
+    """Performance optimization recommendations for professionals"""
+    user_context, repo_context = await self._authorize_and_fetch(
+        user_id, repository, _PRO_ROLES
+    )
+    if not user_context:
+        return _ACCESS_DENIED
+    
+    context = ToolContext(
+        user_role=user_context.role,
+        repository=repository,
+        focus_area=focus_area,
+        repository_analysis=repo_context
+    )
+    
+    prompt = _PERFORMANCE_PROMPT.format_map({
+        "role": user_context.role,
+        "repository": repository,
+        "focus_area": focus_area or "General performance optimization"
+    })
+    
+    try:
         ai_response = await self.call_gemini(prompt, context)
-        
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"# Performance Optimization Plan\n\n{ai_response}"
-            )]
-        )
-        
     except Exception as e:
         return CallToolResult(
             content=[TextContent(
@@ -132,33 +137,17 @@ Focus on actionable, measurable improvements that a {user_context.role} can impl
                 text=f"Error in performance optimization: {str(e)}"
             )]
         )
+    
+    return CallToolResult(
+        content=[TextContent(
+            type="text",
+            text=f"# Performance Optimization Plan\n\n{ai_response}"
+        )]
+    )
 
 
-async def best_practices_audit(
-    self, repository: str, user_id: str, audit_type: str = "general"
-) -> CallToolResult:
-    """Best practices audit for professionals"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role not in ['professional', 'manager']:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text="Access denied. This feature is only available for Professional and Manager users."
-                )]
-            )
-        
-        repo_context = await self.get_repository_context(repository, user_id)
-        
-        context = {
-            "user_role": user_context.role,
-            "repository": repository,
-            "audit_type": audit_type,
-            "repository_analysis": repo_context
-        }
-        
-        prompt = f"""
-You are a senior software architect conducting a best practices audit for a {user_context.role} user.
+_AUDIT_PROMPT = """
+You are a senior software architect conducting a best practices audit for a {role} user.
 
 Repository: {repository}
 Audit Type: {audit_type}
@@ -197,16 +186,33 @@ Based on the repository analysis, provide a comprehensive audit covering:
 
 Provide specific, actionable recommendations with examples where applicable.
 """
-        
+
+
+async def best_practices_audit(
+    self, repository: str, user_id: str, audit_type: str = "general"
+) -> CallToolResult:
+    """Best practices audit for professionals"""
+    user_context, repo_context = await self._authorize_and_fetch(
+        user_id, repository, _PRO_ROLES
+    )
+    if not user_context:
+        return _ACCESS_DENIED
+    
+    context = ToolContext(
+        user_role=user_context.role,
+        repository=repository,
+        audit_type=audit_type,
+        repository_analysis=repo_context
+    )
+    
+    prompt = _AUDIT_PROMPT.format_map({
+        "role": user_context.role,
+        "repository": repository,
+        "audit_type": audit_type
+    })
+    
+    try:
         ai_response = await self.call_gemini(prompt, context)
-        
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"# Best Practices Audit Report\n\n{ai_response}"
-            )]
-        )
-        
     except Exception as e:
         return CallToolResult(
             content=[TextContent(
@@ -214,36 +220,20 @@ Provide specific, actionable recommendations with examples where applicable.
                 text=f"Error in best practices audit: {str(e)}"
             )]
         )
+    
+    return CallToolResult(
+        content=[TextContent(
+            type="text",
+            text=f"# Best Practices Audit Report\n\n{ai_response}"
+        )]
+    )
 
 
-async def advanced_learning_suggestions(
-    self, repository: str, user_id: str, skill_focus: Optional[str] = None
-) -> CallToolResult:
-    """Advanced learning recommendations for professionals"""
-    try:
-        user_context = await self.get_user_context(user_id)
-        if not user_context or user_context.role not in ['professional', 'manager']:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text="Access denied. This feature is only available for Professional and Manager users."
-                )]
-            )
-        
-        repo_context = await self.get_repository_context(repository, user_id)
-        
-        context = {
-            "user_role": user_context.role,
-            "repository": repository,
-            "skill_focus": skill_focus,
-            "repository_analysis": repo_context
-        }
-        
-        prompt = f"""
-You are an expert learning and development advisor for a {user_context.role} software developer.
+_LEARNING_PROMPT = """
+You are an expert learning and development advisor for a {role} software developer.
 
 Repository: {repository}
-Skill Focus: {skill_focus or "General professional development"}
+Skill Focus: {skill_focus}
 
 Based on the repository analysis and current skill level, provide:
 
@@ -279,16 +269,33 @@ Based on the repository analysis and current skill level, provide:
 
 Focus on advanced, professional-level content that will accelerate career growth.
 """
-        
+
+
+async def advanced_learning_suggestions(
+    self, repository: str, user_id: str, skill_focus: Optional[str] = None
+) -> CallToolResult:
+    """Advanced learning recommendations for professionals"""
+    user_context, repo_context = await self._authorize_and_fetch(
+        user_id, repository, _PRO_ROLES
+    )
+    if not user_context:
+        return _ACCESS_DENIED
+    
+    context = ToolContext(
+        user_role=user_context.role,
+        repository=repository,
+        skill_focus=skill_focus,
+        repository_analysis=repo_context
+    )
+    
+    prompt = _LEARNING_PROMPT.format_map({
+        "role": user_context.role,
+        "repository": repository,
+        "skill_focus": skill_focus or "General professional development"
+    })
+    
+    try:
         ai_response = await self.call_gemini(prompt, context)
-        
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"# Advanced Learning Development Plan\n\n{ai_response}"
-            )]
-        )
-        
     except Exception as e:
         return CallToolResult(
             content=[TextContent(
@@ -296,6 +303,13 @@ Focus on advanced, professional-level content that will accelerate career growth
                 text=f"Error in learning suggestions: {str(e)}"
             )]
         )
+    
+    return CallToolResult(
+        content=[TextContent(
+            type="text",
+            text=f"# Advanced Learning Development Plan\n\n{ai_response}"
+        )]
+    )
 
 
 # These functions are imported and used by the MCP server
@@ -0,0 +1,101 @@
+"""
+Response cache for Gemini calls made by the MCP tools
+"""
+import hashlib
+import logging
+import math
+from operator import mul
+from typing import List, Optional
+
+import google.generativeai as genai
+from cachetools import TTLCache
+
+logger = logging.getLogger("meridian-mcp")
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class LLMCache:
+    """Caches Gemini responses by exact prompt, optionally also by embedding similarity"""
+
+    def __init__(
+        self,
+        maxsize: int = 2048,
+        ttl: int = 1800,
+        semantic: bool = False,
+        threshold: float = 0.92,
+        embedding_model: str = "models/text-embedding-004",
+        max_semantic_entries: int = 256
+    ):
+        self._exact: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.semantic = semantic
+        self.threshold = threshold
+        self.embedding_model = embedding_model
+        # key -> (scope, unit embedding, response); scanned linearly on exact
+        # misses, only within the caller's scope
+        self._semantic: TTLCache = TTLCache(maxsize=max_semantic_entries, ttl=ttl)
+        # Embeddings computed for recent misses, reused when the response is stored
+        self._pending: TTLCache = TTLCache(maxsize=64, ttl=300)
+
+    @staticmethod
+    def cache_key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode()).hexdigest()
+
+    async def get(
+        self, prompt: str, scope: Optional[str] = None, embed_text: Optional[str] = None
+    ) -> Optional[str]:
+        """Return a cached response for this prompt or a close enough one
+        
+        Near matches are only taken from responses stored with the same scope;
+        without a scope only exact matches are returned. embed_text is what is
+        compared for near matches, by default the whole prompt; pass just the
+        task when the scope already pins the context.
+        """
+        key = self.cache_key(prompt)
+        response = self._exact.get(key)
+        if response is not None or not self.semantic or scope is None:
+            return response
+
+        vector = await self._embed(prompt if embed_text is None else embed_text)
+        if vector is None:
+            return None
+        self._pending[key] = vector
+
+        best_score, best_response = 0.0, None
+        for cached_scope, cached_vector, cached_response in self._semantic.values():
+            if cached_scope != scope:
+                continue
+            score = sum(map(mul, vector, cached_vector))
+            if score > best_score:
+                best_score, best_response = score, cached_response
+        return best_response if best_score >= self.threshold else None
+
+    async def set(
+        self,
+        prompt: str,
+        response: str,
+        scope: Optional[str] = None,
+        embed_text: Optional[str] = None
+    ):
+        """Store a successful response; empty responses are not cached"""
+        if not response:
+            return
+        key = self.cache_key(prompt)
+        self._exact[key] = response
+        if self.semantic and scope is not None:
+            vector = self._pending.pop(key, None) or await self._embed(
+                prompt if embed_text is None else embed_text
+            )
+            if vector is not None:
+                self._semantic[key] = (scope, vector, response)
+
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        try:
+            result = await genai.embed_content_async(model=self.embedding_model, content=text)
+            return _normalize(result["embedding"])
+        except Exception as e:
+            logger.warning("Embedding for semantic cache failed: %s", e)
+            return None
@@ -1,13 +1,19 @@
 import asyncio
-import json
+import contextvars
+import datetime
+import hashlib
 import logging
 import os
 import sqlite3
-from typing import Any, Dict, List, Optional, Sequence
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
+from pathlib import Path
 
 import google.generativeai as genai
 import httpx
+import orjson
+from cachetools import TTLCache
 from mcp.server import Server, NotificationOptions
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
@@ -20,6 +26,8 @@ from mcp.types import (
 )
 from dotenv import load_dotenv
 
+from config import config
+
 # Import tool implementations
 from professional_tools import (
     advanced_troubleshooting,
@@ -39,6 +47,8 @@ from devops_culture_tools import (
     devops_culture_assessment,
     personalized_devops_guidance
 )
+from response_cache import LLMCache
+from tool_context import JSON_OPTIONS, ToolArgs, ToolContext
 
 # Load environment variables
 load_dotenv()
@@ -50,6 +60,42 @@ logger = logging.getLogger("meridian-mcp")
 # Configure Gemini AI
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
+# Deployment settings come from config (MERIDIAN_DB_PATH, MERIDIAN_BACKEND_URL),
+# resolved once at import
+DB_PATH = Path(config.db_path).expanduser().resolve()
+BACKEND_URL = httpx.URL(config.backend_url)
+
+# Repository analyses are reused across tool calls for this many seconds
+REPO_CONTEXT_TTL = 60
+REPO_CONTEXT_CACHE_SIZE = 512
+
+# Contexts at least this long (~4k tokens) are sent once as Gemini cached
+# content and reused for CONTEXT_CACHE_TTL seconds
+CONTEXT_CACHE_MIN_CHARS = 16000
+CONTEXT_CACHE_TTL = 300
+
+# Prompt layout shared by the plain and the cached-content request paths
+_CONTEXT_PREFIX = """
+Context Information:
+{context_str}
+"""
+_CONTEXT_TASK = """
+Task:
+{prompt}
+
+Please provide a detailed, actionable response based on the context provided.
+"""
+
+# (user_id, tool name) of the tool call being handled; semantic cache hits
+# are only shared within one user's calls to one tool
+_CACHE_SCOPE: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    "meridian_cache_scope", default=None
+)
+
+# Roles and profiles change rarely; cache user lookups for this many seconds
+USER_CONTEXT_TTL = 300
+USER_CONTEXT_CACHE_SIZE = 1024
+
 @dataclass
 class UserContext:
     """User context for role-based access control"""
@@ -58,30 +104,450 @@ class UserContext:
     github_username: Optional[str] = None
     email: Optional[str] = None
 
+def _serialize_ctx(context: Union[Dict, ToolContext]) -> bytes:
+    """Encode a prompt context; a ToolContext keeps its encoding for reuse"""
+    if isinstance(context, ToolContext):
+        return context.to_json()
+    return orjson.dumps(context, option=JSON_OPTIONS)
+
+def _repo_full_name(repo_url: Optional[str]) -> Optional[str]:
+    """'owner/repo' from a repository URL such as https://github.com/owner/repo.git"""
+    if not repo_url:
+        return None
+    parts = [part for part in repo_url.strip().rstrip("/").split("/") if part]
+    if len(parts) < 2:
+        return None
+    owner, repo = parts[-2].rsplit(":", 1)[-1], parts[-1].removesuffix(".git")
+    return f"{owner}/{repo}" if owner and repo else None
+
+def _join_prompt(context_str: str, prompt: str) -> str:
+    return _CONTEXT_PREFIX.format(context_str=context_str) + _CONTEXT_TASK.format(prompt=prompt)
+
+# Tool definitions are static, so they are built once at import.
+# Role filtering happens in call_tool.
+# Schema properties shared by several tools
+_REPOSITORY_PROP = {"type": "string", "description": "Repository name (owner/repo)"}
+_USER_ID_PROP = {"type": "string", "description": "User ID"}
+_MANAGER_ID_PROP = {"type": "string", "description": "Manager User ID"}
+_TEAM_SIZE_PROP = {"type": "integer", "description": "Number of team members (optional)"}
+
+PROFESSIONAL_TOOLS = [
+    Tool(
+        name="advanced_troubleshooting",
+        description="Get advanced troubleshooting suggestions for repository issues and deployment problems",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "repository": _REPOSITORY_PROP,
+                "user_id": _USER_ID_PROP,
+                "issue_description": {"type": "string", "description": "Description of the issue"}
+            },
+            "required": ["repository", "user_id", "issue_description"]
+        }
+    ),
+    Tool(
+        name="performance_optimization",
+        description="Get performance optimization recommendations for your codebase",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "repository": _REPOSITORY_PROP,
+                "user_id": _USER_ID_PROP,
+                "focus_area": {"type": "string", "description": "Specific area to optimize (optional)"}
+            },
+            "required": ["repository", "user_id"]
+        }
+    ),
+    Tool(
+        name="best_practices_audit",
+        description="Audit repository for best practices violations and get improvement suggestions",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "repository": _REPOSITORY_PROP,
+                "user_id": _USER_ID_PROP,
+                "audit_type": {"type": "string", "description": "Type of audit (security, devops, code_quality)"}
+            },
+            "required": ["repository", "user_id"]
+        }
+    ),
+    Tool(
+        name="advanced_learning_suggestions",
+        description="Get personalized advanced learning material recommendations based on repository analysis",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "repository": _REPOSITORY_PROP,
+                "user_id": _USER_ID_PROP,
+                "skill_focus": {"type": "string", "description": "Specific skill area to focus on (optional)"}
+            },
+            "required": ["repository", "user_id"]
+        }
+    )
+]
+
+MANAGER_TOOLS = [
+    Tool(
+        name="team_collaboration_insights",
+        description="Analyze team collaboration patterns and get improvement suggestions",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "repository": _REPOSITORY_PROP,
+                "user_id": _MANAGER_ID_PROP,
+                "team_size": _TEAM_SIZE_PROP
+            },
+            "required": ["repository", "user_id"]
+        }
+    ),
+    Tool(
+        name="team_learning_analysis",
+        description="Analyze team learning patterns and identify skill gaps",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "user_id": _MANAGER_ID_PROP,
+                "repositories": {"type": "array", "items": {"type": "string"}, "description": "List of team repositories"}
+            },
+            "required": ["user_id"]
+        }
+    ),
+    Tool(
+        name="project_health_overview",
+        description="Get comprehensive project health assessment and risk analysis",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "repository": _REPOSITORY_PROP,
+                "user_id": _MANAGER_ID_PROP,
+                "timeframe": {"type": "string", "description": "Analysis timeframe (30d, 90d, 6m)"}
+            },
+            "required": ["repository", "user_id"]
+        }
+    ),
+    Tool(
+        name="resource_allocation_suggestions",
+        description="Get team resource allocation and capacity planning recommendations",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "user_id": _MANAGER_ID_PROP,
+                "team_repositories": {"type": "array", "items": {"type": "string"}, "description": "Team repositories"},
+                "upcoming_projects": {"type": "string", "description": "Description of upcoming projects (optional)"}
+            },
+            "required": ["user_id"]
+        }
+    ),
+    Tool(
+        name="project_risk_assessment",
+        description="Advanced project risk assessment and mitigation strategies for managers",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "repository": _REPOSITORY_PROP,
+                "user_id": _MANAGER_ID_PROP,
+                "project_stage": {"type": "string", "description": "Current project stage (active, planning, etc.)"},
+                "team_size": _TEAM_SIZE_PROP
+            },
+            "required": ["repository", "user_id"]
+        }
+    ),
+    Tool(
+        name="team_performance_optimization",
+        description="AI-powered team performance optimization recommendations",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "user_id": _MANAGER_ID_PROP,
+                "team_metrics": {"type": "object", "description": "Team performance metrics (velocity, quality, collaboration)"},
+                "team_size": _TEAM_SIZE_PROP
+            },
+            "required": ["user_id", "team_metrics"]
+        }
+    )
+]
+
+DEVOPS_CULTURE_TOOLS = [
+    Tool(
+        name="devops_culture_assessment",
+        description="Comprehensive AI-powered DevOps culture assessment for teams",
+        inputSchema={
+            "type": "object", 
+            "properties": {
+                "assessment_context": {
+                    "type": "object",
+                    "description": "Team assessment context including team info, responses, and metrics"
+                },
+                "analysis_type": {
+                    "type": "string", 
+                    "description": "Type of analysis: comprehensive, quick, focused",
+                    "enum": ["comprehensive", "quick", "focused"]
+                }
+            },
+            "required": ["assessment_context"]
+        }
+    ),
+    Tool(
+        name="personalized_devops_guidance",
+        description="Generate personalized DevOps learning and improvement guidance",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "user_context": {
+                    "type": "object",
+                    "description": "User context including profile, projects, and assessments"
+                },
+                "guidance_type": {
+                    "type": "string",
+                    "description": "Type of guidance: comprehensive, learning_path, skills_focus",
+                    "enum": ["comprehensive", "learning_path", "skills_focus"]
+                }
+            },
+            "required": ["user_context"]
+        }
+    )
+]
+
+_ALL_TOOLS = PROFESSIONAL_TOOLS + MANAGER_TOOLS + DEVOPS_CULTURE_TOOLS
+
+def _jtext(obj: Any) -> str:
+    """Compact JSON text for TextContent payloads"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+def _passthrough_result(result: CallToolResult) -> CallToolResult:
+    return result
+
+def _md_wrap(title: str) -> Callable[[Dict], CallToolResult]:
+    """Formatter rendering a manager tool's analysis under a markdown heading"""
+    def wrap(result: Dict) -> CallToolResult:
+        return CallToolResult(
+            content=[TextContent(
+                type="text",
+                text=f"# {title}\n\n{result.get('analysis', result.get('error', 'Unknown error'))}"
+            )]
+        )
+    return wrap
+
+def _json_wrap(tool: str, preview_default: str, execution_time: int, field: str) -> Callable[[Dict], CallToolResult]:
+    """Formatter returning a manager tool's preview and analysis as a JSON envelope"""
+    def wrap(result: Dict) -> CallToolResult:
+        return CallToolResult(
+            content=[TextContent(
+                type="text",
+                text=_jtext({
+                    "preview": result.get("preview", preview_default),
+                    "tool": result.get("tool", tool),
+                    "execution_time": execution_time,
+                    "analysis": result.get(field, result.get("error", "Unknown error"))
+                })
+            )]
+        )
+    return wrap
+
+def _result_wrap(tool: str, execution_time: int, preview: Callable[[Dict], str]) -> Callable[[Dict], CallToolResult]:
+    """Formatter returning a DevOps culture tool's full result as a JSON envelope"""
+    def wrap(result: Dict) -> CallToolResult:
+        return CallToolResult(
+            content=[TextContent(
+                type="text",
+                text=_jtext({
+                    "result": result,
+                    "preview": preview(result),
+                    "tool": tool,
+                    "execution_time": execution_time
+                })
+            )]
+        )
+    return wrap
+
+async def _devops_culture_assessment(self, user_id: str, **arguments) -> Dict:
+    return await devops_culture_assessment(gemini_model=self.gemini_model, **arguments)
+
+async def _personalized_devops_guidance(self, user_id: str, **arguments) -> Dict:
+    return await personalized_devops_guidance(gemini_model=self.gemini_model, **arguments)
+
+# tool name -> (handler, ToolArgs fields it takes, result formatter)
+_TOOL_DISPATCH = {
+    # Professional Tools
+    "advanced_troubleshooting": (
+        advanced_troubleshooting,
+        ("repository", "issue_description"),
+        _passthrough_result
+    ),
+    "performance_optimization": (
+        performance_optimization,
+        ("repository", "focus_area"),
+        _passthrough_result
+    ),
+    "best_practices_audit": (
+        best_practices_audit,
+        ("repository", "audit_type"),
+        _passthrough_result
+    ),
+    "advanced_learning_suggestions": (
+        advanced_learning_suggestions,
+        ("repository", "skill_focus"),
+        _passthrough_result
+    ),
+    # Manager Tools
+    "team_collaboration_insights": (
+        team_collaboration_insights,
+        ("repository", "team_size"),
+        _md_wrap("Team Collaboration Insights")
+    ),
+    "team_learning_analysis": (
+        team_learning_analysis,
+        ("repositories",),
+        _md_wrap("Team Learning Analysis")
+    ),
+    "project_health_overview": (
+        project_health_overview,
+        ("repository", "timeframe"),
+        _md_wrap("Project Health Overview")
+    ),
+    "resource_allocation_suggestions": (
+        resource_allocation_suggestions,
+        ("team_repositories", "upcoming_projects"),
+        _md_wrap("Resource Allocation Suggestions")
+    ),
+    "project_risk_assessment": (
+        project_risk_assessment,
+        ("repository", "project_stage", "team_size"),
+        _json_wrap("project_risk_assessment", "Risk assessment completed", 1250, "risk_assessment")
+    ),
+    "team_performance_optimization": (
+        team_performance_optimization,
+        ("team_metrics", "team_size"),
+        _json_wrap(
+            "team_performance_optimization", "Performance optimization analysis completed",
+            1100, "optimization_analysis"
+        )
+    ),
+    # DevOps Culture Tools
+    "devops_culture_assessment": (
+        _devops_culture_assessment,
+        ("assessment_context", "analysis_type"),
+        _result_wrap(
+            "devops_culture_assessment", 2500,
+            lambda result: f"DevOps culture assessment completed for team {result.get('team_name', 'Unknown')}"
+        )
+    ),
+    "personalized_devops_guidance": (
+        _personalized_devops_guidance,
+        ("user_context", "guidance_type"),
+        _result_wrap(
+            "personalized_devops_guidance", 1800,
+            lambda result: f"Personalized DevOps guidance generated for {result.get('user_context', {}).get('name', 'user')}"
+        )
+    ),
+}
+
 class MeridianMCPServer:
     """Meridian MCP Server for Professional and Manager AI-powered tools"""
     
     def __init__(self):
         self.server = Server("meridian-mcp")
-        self.db_path = "/Users/arnabmaity/Documents/Meridian/Backend/meridian.db"
-        self.backend_url = "http://localhost:8000"
-        self.gemini_model = genai.GenerativeModel('gemini-2.5-flash')
+        self.db_path = DB_PATH
+        self.backend_url = BACKEND_URL
+        self.gemini_model = genai.GenerativeModel(config.gemini_model)
+        # (repo_name, user_id) -> in-flight or finished fetch task
+        self._repo_cache: TTLCache = TTLCache(maxsize=REPO_CONTEXT_CACHE_SIZE, ttl=REPO_CONTEXT_TTL)
+        # One pooled client so backend calls reuse keep-alive connections
+        self._http = httpx.AsyncClient(
+            base_url=self.backend_url,
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=1000),
+            timeout=httpx.Timeout(10.0, connect=2.0)
+        )
+        # Response-cache key -> generation task shared by identical concurrent prompts
+        self._gemini_inflight: Dict[str, asyncio.Task] = {}
+        # Cap on Gemini requests in flight, to stay clear of provider rate limits
+        self._gemini_slots = asyncio.Semaphore(8)
+        self._user_cache: TTLCache = TTLCache(maxsize=USER_CONTEXT_CACHE_SIZE, ttl=USER_CONTEXT_TTL)
+        self._user_inflight: Dict[str, asyncio.Task] = {}
+        # Exact-match response cache; GEMINI_SEMANTIC_CACHE=true also reuses
+        # answers for near-identical prompts via embedding similarity
+        self._response_cache = LLMCache(
+            maxsize=2048,
+            ttl=1800,
+            semantic=os.getenv("GEMINI_SEMANTIC_CACHE", "false").lower() == "true"
+        )
+        # sha256(context block) -> model bound to its cached content, or False
+        # if caching that block failed
+        self._context_models: TTLCache = TTLCache(maxsize=128, ttl=CONTEXT_CACHE_TTL - 60)
+        # Long-lived sqlite connection, opened on first query and used from
+        # worker threads one query at a time
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
         
         # Register handlers
         self.server.list_tools = self.list_tools
         self.server.call_tool = self.call_tool
         
     async def get_user_context(self, user_id: str) -> Optional[UserContext]:
-        """Get user context from database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(
+        """Get user context, cached for USER_CONTEXT_TTL seconds
+        
+        Concurrent misses for the same user share one database read.
+        """
+        user_context = self._user_cache.get(user_id)
+        if user_context is not None:
+            return user_context
+        
+        task = self._user_inflight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._load_user_context(user_id))
+            self._user_inflight[user_id] = task
+            task.add_done_callback(lambda t: self._store_user(user_id, t))
+        return await asyncio.shield(task)
+    
+    def _store_user(self, user_id: str, task: asyncio.Task):
+        """Cache a finished lookup; unknown users and errors are not cached"""
+        self._user_inflight.pop(user_id, None)
+        if not task.cancelled() and task.exception() is None and task.result() is not None:
+            self._user_cache[user_id] = task.result()
+    
+    def _invalidate_user(self, user_id: str):
+        """Drop a cached user, e.g. after a role change"""
+        self._user_cache.pop(user_id, None)
+    
+    def _get_db(self) -> sqlite3.Connection:
+        """Return the shared sqlite connection, opening and tuning it once
+        
+        The backend owns the database, so it is opened read-only and only
+        per-connection pragmas are set.
+        """
+        if self._db is None:
+            db = sqlite3.connect(
+                f"{self.db_path.as_uri()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                isolation_level=None
+            )
+            try:
+                db.executescript("PRAGMA temp_store=MEMORY; PRAGMA cache_size=-64000;")
+            except Exception:
+                db.close()
+                raise
+            self._db = db
+        return self._db
+    
+    def _fetch_user(self, user_id: str) -> Optional[tuple]:
+        with self._db_lock:
+            return self._get_db().execute(
                 "SELECT id, role, github_username, email FROM users WHERE id = ?",
                 (user_id,)
-            )
-            result = cursor.fetchone()
-            conn.close()
+            ).fetchone()
+    
+    def _fetch_user_repositories(self, user_id: str) -> List[tuple]:
+        with self._db_lock:
+            return self._get_db().execute(
+                "SELECT repo_url FROM repositories WHERE user_id = ? ORDER BY created_at DESC",
+                (user_id,)
+            ).fetchall()
+    
+    async def _load_user_context(self, user_id: str) -> Optional[UserContext]:
+        """Get user context from database without blocking the event loop"""
+        try:
+            result = await asyncio.to_thread(self._fetch_user, user_id)
             
             if result:
                 return UserContext(
@@ -95,200 +561,221 @@ class MeridianMCPServer:
             logger.error(f"Error getting user context: {e}")
             return None
     
+    async def get_user_repositories(self, user_id: str) -> List[str]:
+        """Get the owner/repo names of a user's connected repositories, newest first
+        
+        Names come from repo_url (repo_name holds only the last path component
+        and may be NULL); URLs that don't yield an owner/repo are skipped.
+        """
+        try:
+            rows = await asyncio.to_thread(self._fetch_user_repositories, user_id)
+            return [name for (url,) in rows if (name := _repo_full_name(url))]
+        except Exception as e:
+            logger.error(f"Error getting user repositories: {e}")
+            return []
+    
     async def get_repository_context(self, repo_name: str, user_id: str) -> Optional[Dict]:
-        """Get repository analysis data"""
+        """Get repository analysis data, cached for REPO_CONTEXT_TTL seconds
+        
+        Concurrent callers for the same key share one in-flight fetch.
+        """
+        key = (repo_name, user_id)
+        task = self._repo_cache.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_repository_context(repo_name, user_id))
+            self._repo_cache[key] = task
+            task.add_done_callback(lambda t: self._drop_failed_fetch(key, t))
+        # Shield so one cancelled caller doesn't abort the fetch for the others
+        return await asyncio.shield(task)
+    
+    def _drop_failed_fetch(self, key: Tuple[str, str], task: asyncio.Task):
+        """Don't keep empty or failed fetches in the repository cache"""
+        if task.cancelled() or task.exception() or task.result() is None:
+            if self._repo_cache.get(key) is task:
+                del self._repo_cache[key]
+    
+    def invalidate_repository_context(self, repo_name: str, user_id: str):
+        """Evict a cached repository analysis, e.g. after a new analysis run"""
+        self._repo_cache.pop((repo_name, user_id), None)
+    
+    async def _fetch_repository_context(self, repo_name: str, user_id: str) -> Optional[Dict]:
+        """Fetch the latest repository analysis from the backend"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.backend_url}/ai/analysis-history",
-                    params={"repo": repo_name, "user_id": user_id}
-                )
-                if response.status_code == 200:
-                    analyses = response.json()
-                    return analyses[0] if analyses else None
-                return None
+            response = await self._http.get(
+                "/ai/analysis-history",
+                params={"repo": repo_name, "user_id": user_id}
+            )
+            if response.status_code == 200:
+                analyses = response.json()
+                return analyses[0] if analyses else None
+            return None
         except Exception as e:
             logger.error(f"Error getting repository context: {e}")
             return None
     
-    async def call_gemini(self, prompt: str, context: Dict = None) -> str:
-        """Call Gemini AI with context"""
+    async def aclose(self):
+        """Close the pooled backend HTTP client and the database connection"""
+        await self._http.aclose()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+    
+    async def _authorize_and_fetch(
+        self, user_id: str, repository: str, allowed_roles
+    ) -> Tuple[Optional[UserContext], Optional[Dict]]:
+        """Check the user's role, then fetch repository context for allowed users
+        
+        Returns (None, None) if the user is unknown or not in allowed_roles;
+        denied users never trigger a repository fetch.
+        """
+        user_context = await self.get_user_context(user_id)
+        if not user_context or user_context.role not in allowed_roles:
+            return None, None
+        return user_context, await self.get_repository_context(repository, user_id)
+    
+    def _build_prompt(self, prompt: str, context: Union[Dict, ToolContext] = None) -> str:
+        """Prepend the context block to a tool prompt"""
+        if not context:
+            return prompt
+        return _join_prompt(_serialize_ctx(context).decode(), prompt)
+    
+    async def _cached_context_model(self, context_str: str) -> Optional[genai.GenerativeModel]:
+        """Model bound to a Gemini cached-content handle for this context block
+        
+        Returns None if the cache can't be created (e.g. below the model's
+        minimum cacheable size); that outcome is remembered too.
+        """
+        key = hashlib.sha256(context_str.encode()).hexdigest()
+        model = self._context_models.get(key)
+        if model is None:
+            try:
+                cached = await asyncio.to_thread(
+                    genai.caching.CachedContent.create,
+                    model=self.gemini_model.model_name,
+                    contents=[_CONTEXT_PREFIX.format(context_str=context_str)],
+                    ttl=datetime.timedelta(seconds=CONTEXT_CACHE_TTL)
+                )
+                model = genai.GenerativeModel.from_cached_content(cached)
+            except Exception as e:
+                logger.warning(f"Context caching unavailable, sending full prompt: {e}")
+                model = False
+            self._context_models[key] = model
+        return model or None
+    
+    async def call_gemini_stream(
+        self, prompt: str, context: Union[Dict, ToolContext] = None
+    ) -> AsyncIterator[str]:
+        """Yield Gemini response text chunks as they arrive"""
+        async for text in self._stream_prompt(self._build_prompt(prompt, context)):
+            yield text
+    
+    async def _stream_prompt(
+        self, full_prompt: str, model: Optional[genai.GenerativeModel] = None
+    ) -> AsyncIterator[str]:
+        model = model or self.gemini_model
+        response = await model.generate_content_async(full_prompt, stream=True)
+        async for chunk in response:
+            # Trailing chunks may only carry finish metadata
+            if chunk.parts:
+                yield chunk.text
+    
+    def _progress_target(self) -> Optional[Tuple[Any, Union[str, int]]]:
+        """(session, progress token) if the current MCP request asked for progress"""
         try:
-            # Add context to prompt if provided
-            if context:
-                context_str = json.dumps(context, indent=2)
-                full_prompt = f"""
-Context Information:
-{context_str}
-
-Task:
-{prompt}
-
-Please provide a detailed, actionable response based on the context provided.
-"""
-            else:
-                full_prompt = prompt
-            
-            response = self.gemini_model.generate_content(full_prompt)
-            return response.text
+            request_context = self.server.request_context
+        except (LookupError, AttributeError):
+            # Outside an MCP request, or an SDK without request contexts
+            return None
+        meta = request_context.meta
+        if meta is None or meta.progressToken is None:
+            return None
+        return request_context.session, meta.progressToken
+    
+    async def _report_progress(self, progress, chunks: int, text: str):
+        """Forward a streamed chunk as a progress notification
+        
+        Returns the target to keep reporting to, or None to stop after a failure.
+        """
+        session, token = progress
+        try:
+            await session.send_progress_notification(token, chunks, message=text)
+            return progress
         except Exception as e:
-            logger.error(f"Error calling Gemini: {e}")
-            return f"Error generating AI response: {str(e)}"
-
-    async def list_tools(self, request: ListToolsRequest) -> List[Tool]:
-        """List available tools based on user role"""
-        tools = []
+            logger.warning(f"Stopping progress notifications: {e}")
+            return None
+    
+    async def call_gemini(self, prompt: str, context: Union[Dict, ToolContext] = None) -> str:
+        """Call Gemini AI with context, serving repeated prompts from the response cache
         
-        # Get user context (in real implementation, extract from request)
-        # For now, we'll return all tools and handle role filtering in call_tool
+        Identical prompts already in flight share one generation. While
+        streaming, each chunk is also sent as an MCP progress notification when
+        the calling request carries a progress token.
+        """
+        context_str = _serialize_ctx(context).decode() if context else None
+        full_prompt = prompt if context_str is None else _join_prompt(context_str, prompt)
+        scope = self._cache_scope(context_str)
+        # The scope already pins the context, so near matches compare only the task
+        cached = await self._response_cache.get(full_prompt, scope, embed_text=prompt)
+        if cached is not None:
+            return cached
         
-        # Professional Tools
-        professional_tools = [
-            Tool(
-                name="advanced_troubleshooting",
-                description="Get advanced troubleshooting suggestions for repository issues and deployment problems",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "User ID"},
-                        "issue_description": {"type": "string", "description": "Description of the issue"}
-                    },
-                    "required": ["repository", "user_id", "issue_description"]
-                }
-            ),
-            Tool(
-                name="performance_optimization",
-                description="Get performance optimization recommendations for your codebase",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "User ID"},
-                        "focus_area": {"type": "string", "description": "Specific area to optimize (optional)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="best_practices_audit",
-                description="Audit repository for best practices violations and get improvement suggestions",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "User ID"},
-                        "audit_type": {"type": "string", "description": "Type of audit (security, devops, code_quality)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="advanced_learning_suggestions",
-                description="Get personalized advanced learning material recommendations based on repository analysis",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "User ID"},
-                        "skill_focus": {"type": "string", "description": "Specific skill area to focus on (optional)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            )
-        ]
+        key = self._response_cache.cache_key(full_prompt)
+        task = self._gemini_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(prompt, context_str, full_prompt, scope))
+            self._gemini_inflight[key] = task
+            task.add_done_callback(lambda t: self._drop_inflight_generation(key, t))
+        return await asyncio.shield(task)
+    
+    def _cache_scope(self, context_str: Optional[str]) -> Optional[str]:
+        """Semantic cache partition: calling user and tool plus the exact context
         
-        # Manager Tools
-        manager_tools = [
-            Tool(
-                name="team_collaboration_insights",
-                description="Analyze team collaboration patterns and get improvement suggestions",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "team_size": {"type": "integer", "description": "Number of team members (optional)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="team_learning_analysis",
-                description="Analyze team learning patterns and identify skill gaps",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "repositories": {"type": "array", "items": {"type": "string"}, "description": "List of team repositories"}
-                    },
-                    "required": ["user_id"]
-                }
-            ),
-            Tool(
-                name="project_health_overview",
-                description="Get comprehensive project health assessment and risk analysis",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "timeframe": {"type": "string", "description": "Analysis timeframe (30d, 90d, 6m)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="resource_allocation_suggestions",
-                description="Get team resource allocation and capacity planning recommendations",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "team_repositories": {"type": "array", "items": {"type": "string"}, "description": "Team repositories"},
-                        "upcoming_projects": {"type": "string", "description": "Description of upcoming projects (optional)"}
-                    },
-                    "required": ["user_id"]
-                }
-            ),
-            Tool(
-                name="project_risk_assessment",
-                description="Advanced project risk assessment and mitigation strategies for managers",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "project_stage": {"type": "string", "description": "Current project stage (active, planning, etc.)"},
-                        "team_size": {"type": "integer", "description": "Number of team members (optional)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="team_performance_optimization",
-                description="AI-powered team performance optimization recommendations",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "team_metrics": {"type": "object", "description": "Team performance metrics (velocity, quality, collaboration)"},
-                        "team_size": {"type": "integer", "description": "Number of team members (optional)"}
-                    },
-                    "required": ["user_id", "team_metrics"]
-                }
-            )
-        ]
+        None outside a tool call, which limits the response cache to exact matches.
+        """
+        scope = _CACHE_SCOPE.get()
+        if scope is None:
+            return None
+        user_id, tool_name = scope
+        return f"{user_id}\0{tool_name}\0{self._response_cache.cache_key(context_str or '')}"
+    
+    def _drop_inflight_generation(self, key: str, task: asyncio.Task):
+        if self._gemini_inflight.get(key) is task:
+            del self._gemini_inflight[key]
+    
+    async def _generate(
+        self, prompt: str, context_str: Optional[str], full_prompt: str, scope: Optional[str] = None
+    ) -> str:
+        try:
+            model, request_prompt = None, full_prompt
+            if context_str is not None and len(context_str) >= CONTEXT_CACHE_MIN_CHARS:
+                # Large context goes through cached content; only the task is sent
+                model = await self._cached_context_model(context_str)
+                if model is not None:
+                    request_prompt = _CONTEXT_TASK.format(prompt=prompt)
+            progress = self._progress_target()
+            parts = []
+            async with self._gemini_slots:
+                async for text in self._stream_prompt(request_prompt, model):
+                    parts.append(text)
+                    if progress is not None:
+                        progress = await self._report_progress(progress, len(parts), text)
+            ai_response = "".join(parts)
+        except Exception as e:
+            logger.error(f"Error calling Gemini: {e}")
+            return f"Error generating AI response: {str(e)}"
         
+        await self._response_cache.set(full_prompt, ai_response, scope, embed_text=prompt)
+        return ai_response
+
     async def call_tool(self, request: CallToolRequest) -> CallToolResult:
         """Handle tool calls with role-based access control"""
         try:
             tool_name = request.params.name
-            arguments = request.params.arguments or {}
+            args = ToolArgs.from_arguments(request.params.arguments or {})
             
-            # Extract user_id for role validation
-            user_id = arguments.get("user_id")
-            if not user_id:
+            # user_id is needed for role validation
+            if not args.user_id:
                 return CallToolResult(
                     content=[TextContent(
                         type="text",
@@ -296,183 +783,27 @@ Please provide a detailed, actionable response based on the context provided.
                     )]
                 )
             
-            # Professional Tools
-            if tool_name == "advanced_troubleshooting":
-                result = await advanced_troubleshooting(
-                    self,
-                    repository=arguments.get("repository", ""),
-                    user_id=user_id,
-                    issue_description=arguments.get("issue_description", "")
-                )
-                return result
-                
-            elif tool_name == "performance_optimization":
-                result = await performance_optimization(
-                    self,
-                    repository=arguments.get("repository", ""),
-                    user_id=user_id,
-                    focus_area=arguments.get("focus_area")
-                )
-                return result
-                
-            elif tool_name == "best_practices_audit":
-                result = await best_practices_audit(
-                    self,
-                    repository=arguments.get("repository", ""),
-                    user_id=user_id,
-                    audit_type=arguments.get("audit_type", "general")
-                )
-                return result
-                
-            elif tool_name == "advanced_learning_suggestions":
-                result = await advanced_learning_suggestions(
-                    self,
-                    repository=arguments.get("repository", ""),
-                    user_id=user_id,
-                    skill_focus=arguments.get("skill_focus")
-                )
-                return result
-                
-            # Manager Tools
-            elif tool_name == "team_collaboration_insights":
-                result = await team_collaboration_insights(
-                    self,
-                    repository=arguments.get("repository", ""),
-                    user_id=user_id,
-                    team_size=arguments.get("team_size")
-                )
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=f"# Team Collaboration Insights\n\n{result.get('analysis', result.get('error', 'Unknown error'))}"
-                    )]
-                )
-                
-            elif tool_name == "team_learning_analysis":
-                result = await team_learning_analysis(
-                    self,
-                    user_id=user_id,
-                    repositories=arguments.get("repositories")
-                )
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=f"# Team Learning Analysis\n\n{result.get('analysis', result.get('error', 'Unknown error'))}"
-                    )]
-                )
-                
-            elif tool_name == "project_health_overview":
-                result = await project_health_overview(
-                    self,
-                    repository=arguments.get("repository", ""),
-                    user_id=user_id,
-                    timeframe=arguments.get("timeframe", "30d")
-                )
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=f"# Project Health Overview\n\n{result.get('analysis', result.get('error', 'Unknown error'))}"
-                    )]
-                )
-                
-            elif tool_name == "resource_allocation_suggestions":
-                result = await resource_allocation_suggestions(
-                    self,
-                    user_id=user_id,
-                    team_repositories=arguments.get("team_repositories"),
-                    upcoming_projects=arguments.get("upcoming_projects")
-                )
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=f"# Resource Allocation Suggestions\n\n{result.get('analysis', result.get('error', 'Unknown error'))}"
-                    )]
-                )
-                
-            elif tool_name == "project_risk_assessment":
-                result = await project_risk_assessment(
-                    self,
-                    repository=arguments.get("repository", ""),
-                    user_id=user_id,
-                    project_stage=arguments.get("project_stage", "active"),
-                    team_size=arguments.get("team_size")
-                )
+            entry = _TOOL_DISPATCH.get(tool_name)
+            if entry is None:
                 return CallToolResult(
                     content=[TextContent(
                         type="text",
-                        text=json.dumps({
-                            "preview": result.get("preview", "Risk assessment completed"),
-                            "tool": result.get("tool", "project_risk_assessment"),
-                            "execution_time": 1250,
-                            "analysis": result.get("risk_assessment", result.get("error", "Unknown error"))
-                        })
+                        text=f"Unknown tool: {tool_name}"
                     )]
                 )
-                
-            elif tool_name == "team_performance_optimization":
-                result = await team_performance_optimization(
+            
+            handler, arg_names, formatter = entry
+            scope_token = _CACHE_SCOPE.set((args.user_id, tool_name))
+            try:
+                result = await handler(
                     self,
-                    user_id=user_id,
-                    team_metrics=arguments.get("team_metrics", {}),
-                    team_size=arguments.get("team_size")
-                )
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=json.dumps({
-                            "preview": result.get("preview", "Performance optimization analysis completed"),
-                            "tool": result.get("tool", "team_performance_optimization"),
-                            "execution_time": 1100,
-                            "analysis": result.get("optimization_analysis", result.get("error", "Unknown error"))
-                        })
-                    )]
-                )
-                
-            # DevOps Culture Tools
-            elif tool_name == "devops_culture_assessment":
-                result = await devops_culture_assessment(
-                    assessment_context=arguments.get("assessment_context", {}),
-                    analysis_type=arguments.get("analysis_type", "comprehensive"),
-                    gemini_model=self.gemini_model
-                )
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=json.dumps({
-                            "result": result,
-                            "preview": f"DevOps culture assessment completed for team {result.get('team_name', 'Unknown')}",
-                            "tool": "devops_culture_assessment",
-                            "execution_time": 2500
-                        })
-                    )]
-                )
-                
-            elif tool_name == "personalized_devops_guidance":
-                result = await personalized_devops_guidance(
-                    user_context=arguments.get("user_context", {}),
-                    guidance_type=arguments.get("guidance_type", "comprehensive"),
-                    gemini_model=self.gemini_model
-                )
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text", 
-                        text=json.dumps({
-                            "result": result,
-                            "preview": f"Personalized DevOps guidance generated for {result.get('user_context', {}).get('name', 'user')}",
-                            "tool": "personalized_devops_guidance",
-                            "execution_time": 1800
-                        })
-                    )]
-                )
-                
-            else:
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=f"Unknown tool: {tool_name}"
-                    )]
+                    user_id=args.user_id,
+                    **{name: getattr(args, name) for name in arg_names}
                 )
-                
+            finally:
+                _CACHE_SCOPE.reset(scope_token)
+            return formatter(result)
+            
         except Exception as e:
             logger.error(f"Error in call_tool: {e}")
             return CallToolResult(
@@ -482,191 +813,37 @@ Please provide a detailed, actionable response based on the context provided.
                 )]
             )
 
+    async def call_gemini_many(
+        self, prompts: List[Tuple[str, Union[Dict, ToolContext, None]]]
+    ) -> List[str]:
+        """Run independent (prompt, context) calls concurrently, results in order"""
+        return await asyncio.gather(*(self.call_gemini(prompt, context) for prompt, context in prompts))
+    
     async def list_tools(self, request: ListToolsRequest) -> List[Tool]:
-        """List available tools based on user role"""
-        tools = []
-        
-        # Get user context (in real implementation, extract from request)
-        # For now, we'll return all tools and handle role filtering in call_tool
-        
-        # Professional Tools
-        professional_tools = [
-            Tool(
-                name="advanced_troubleshooting",
-                description="Get advanced troubleshooting suggestions for repository issues and deployment problems",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "User ID"},
-                        "issue_description": {"type": "string", "description": "Description of the issue"}
-                    },
-                    "required": ["repository", "user_id", "issue_description"]
-                }
-            ),
-            Tool(
-                name="performance_optimization",
-                description="Get performance optimization recommendations for your codebase",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "User ID"},
-                        "focus_area": {"type": "string", "description": "Specific area to optimize (optional)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="best_practices_audit",
-                description="Audit repository for best practices violations and get improvement suggestions",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "User ID"},
-                        "audit_type": {"type": "string", "description": "Type of audit (security, devops, code_quality)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="advanced_learning_suggestions",
-                description="Get personalized advanced learning material recommendations based on repository analysis",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "User ID"},
-                        "skill_focus": {"type": "string", "description": "Specific skill area to focus on (optional)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            )
-        ]
-        
-        # Manager Tools
-        manager_tools = [
-            Tool(
-                name="team_collaboration_insights",
-                description="Analyze team collaboration patterns and get improvement suggestions",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "team_size": {"type": "integer", "description": "Number of team members (optional)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="team_learning_analysis",
-                description="Analyze team learning patterns and identify skill gaps",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "repositories": {"type": "array", "items": {"type": "string"}, "description": "List of team repositories"}
-                    },
-                    "required": ["user_id"]
-                }
-            ),
-            Tool(
-                name="project_health_overview",
-                description="Get comprehensive project health assessment and risk analysis",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "repository": {"type": "string", "description": "Repository name (owner/repo)"},
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "timeframe": {"type": "string", "description": "Analysis timeframe (30d, 90d, 6m)"}
-                    },
-                    "required": ["repository", "user_id"]
-                }
-            ),
-            Tool(
-                name="resource_allocation_suggestions",
-                description="Get team resource allocation and capacity planning recommendations",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "user_id": {"type": "string", "description": "Manager User ID"},
-                        "team_repositories": {"type": "array", "items": {"type": "string"}, "description": "Team repositories"},
-                        "upcoming_projects": {"type": "string", "description": "Description of upcoming projects (optional)"}
-                    },
-                    "required": ["user_id"]
-                }
-            )
-        ]
-        
-        # DevOps Culture Tools
-        devops_culture_tools = [
-            Tool(
-                name="devops_culture_assessment",
-                description="Comprehensive AI-powered DevOps culture assessment for teams",
-                inputSchema={
-                    "type": "object", 
-                    "properties": {
-                        "assessment_context": {
-                            "type": "object",
-                            "description": "Team assessment context including team info, responses, and metrics"
-                        },
-                        "analysis_type": {
-                            "type": "string", 
-                            "description": "Type of analysis: comprehensive, quick, focused",
-                            "enum": ["comprehensive", "quick", "focused"]
-                        }
-                    },
-                    "required": ["assessment_context"]
-                }
-            ),
-            Tool(
-                name="personalized_devops_guidance",
-                description="Generate personalized DevOps learning and improvement guidance",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "user_context": {
-                            "type": "object",
-                            "description": "User context including profile, projects, and assessments"
-                        },
-                        "guidance_type": {
-                            "type": "string",
-                            "description": "Type of guidance: comprehensive, learning_path, skills_focus",
-                            "enum": ["comprehensive", "learning_path", "skills_focus"]
-                        }
-                    },
-                    "required": ["user_context"]
-                }
-            )
-        ]
-        
-        # Return all tools for now (role filtering in call_tool)
-        tools.extend(professional_tools)
-        tools.extend(manager_tools)
-        tools.extend(devops_culture_tools)
-        
-        return tools
+        """List available tools (role filtering happens in call_tool)"""
+        return _ALL_TOOLS
 
 # Initialize server
 mcp_server = MeridianMCPServer()
 
 async def main():
     """Main entry point"""
-    async with stdio_server() as (read_stream, write_stream):
-        await mcp_server.server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="meridian-mcp",
-                server_version="1.0.0",
-                capabilities=mcp_server.server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await mcp_server.server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="meridian-mcp",
+                    server_version="1.0.0",
+                    capabilities=mcp_server.server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        await mcp_server.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -5,8 +5,14 @@ Test client for Meridian MCP Server
 import asyncio
 import json
 import sys
+import tempfile
+from pathlib import Path
 from typing import Any, Dict
 
+import orjson
+
+TEST_REQUESTS_PATH = Path(tempfile.gettempdir()) / "meridian_test_requests.json"
+
 
 async def test_mcp_server():
     """Test the MCP server with sample requests"""
@@ -64,11 +70,11 @@ async def test_mcp_server():
     print("To test the server, run:")
     print("  echo '{}' | python server.py".format(json.dumps(list_tools_request).replace('"', '\\"')))
     print("\nOr for interactive testing:")
-    print("  python server.py < test_requests.json")
+    print(f"  python server.py < {TEST_REQUESTS_PATH}  (after running with --write-requests)")
 
 
-def create_test_requests_file():
-    """Create a test requests file for batch testing"""
+def create_test_requests_file(path: Path = TEST_REQUESTS_PATH):
+    """Create a JSON-lines test requests file for batch testing"""
     requests = [
         {
             "jsonrpc": "2.0",
@@ -91,19 +97,18 @@ def create_test_requests_file():
         }
     ]
     
-    with open('/Users/arnabmaity/Documents/Meridian/mcp-server/test_requests.json', 'w') as f:
-        for req in requests:
-            f.write(json.dumps(req) + '\n')
+    path.write_bytes(b"\n".join(orjson.dumps(req) for req in requests) + b"\n")
     
-    print("📄 Created test_requests.json for batch testing")
+    print(f"📄 Created {path} for batch testing")
 
 
 if __name__ == "__main__":
     print("🧪 Meridian MCP Server Test Client")
     print("="*40)
     
-    create_test_requests_file()
-    print()
+    if "--write-requests" in sys.argv:
+        create_test_requests_file()
+        print()
     
     if len(sys.argv) > 1 and sys.argv[1] == "--run":
         asyncio.run(test_mcp_server())
@@ -5,89 +5,129 @@ Test script for Meridian MCP Server tools
 This script tests the MCP tools functionality
 """
 
+import argparse
 import asyncio
+import functools
+import importlib.util
 import json
-import subprocess
-import sys
-import tempfile
 import os
+from contextlib import contextmanager
+from pathlib import Path
 
-async def test_mcp_tools():
-    """Test MCP server tools"""
-    print("🧪 Testing Meridian MCP Server Tools...")
+from meridian_testing import run
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+@contextmanager
+def chdir(path):
+    """Temporarily change the working directory
     
-    # Test data
-    test_requests = [
-        {
-            "tool": "advanced_troubleshooting", 
-            "params": {
-                "repository": "test/repo",
-                "user_id": "test_user_professional", 
-                "issue_description": "Application crashes on startup with memory error"
-            },
-            "expected_role": "professional"
+    The MCP server runs on Python 3.10, the oldest version with the slots
+    dataclasses in tool_context.py; contextlib.chdir only arrived in 3.11.
+    """
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+# Fixed JSON-RPC fields shared by every tools/call request
+ENVELOPE = {"jsonrpc": "2.0", "id": 1, "method": "tools/call"}
+
+# Test data
+TEST_REQUESTS = [
+    {
+        "tool": "advanced_troubleshooting", 
+        "params": {
+            "repository": "test/repo",
+            "user_id": "test_user_professional", 
+            "issue_description": "Application crashes on startup with memory error"
         },
-        {
-            "tool": "team_collaboration_insights",
-            "params": {
-                "repository": "team/project", 
-                "user_id": "test_user_manager",
-                "team_size": 5
-            },
-            "expected_role": "manager"
-        }
-    ]
+        "expected_role": "professional"
+    },
+    {
+        "tool": "team_collaboration_insights",
+        "params": {
+            "repository": "team/project", 
+            "user_id": "test_user_manager",
+            "team_size": 5
+        },
+        "expected_role": "manager"
+    }
+]
+
+async def check_mcp_tools(batch_size: int = 8):
+    """Test MCP server tools, at most batch_size requests at a time"""
+    print("🧪 Testing Meridian MCP Server Tools...")
     
-    for test_req in test_requests:
-        print(f"\n📋 Testing {test_req['tool']}...")
-        
-        # Create MCP request JSON
-        mcp_request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "tools/call",
-            "params": {
-                "name": test_req["tool"],
-                "arguments": test_req["params"]
-            }
-        }
+    sem = asyncio.Semaphore(batch_size)
+    
+    async def run_one(test_req):
+        # Collect output so it prints in request order once all have run
+        lines = [f"\n📋 Testing {test_req['tool']}..."]
         
-        # Write request to temp file  
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(mcp_request, f)
-            request_file = f.name
-            
-        try:
-            # Test the server by importing it (simulated test)
-            print(f"   ✅ Tool definition exists: {test_req['tool']}")
-            print(f"   ✅ Required role: {test_req['expected_role']}")
-            print(f"   ✅ Parameters validated: {list(test_req['params'].keys())}")
-            
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
-            
-        finally:
-            # Cleanup
-            os.unlink(request_file)
+        async with sem:
+            try:
+                # Encode the MCP request as it would be sent (simulated test)
+                payload = _dumps({
+                    **ENVELOPE,
+                    "params": {"name": test_req["tool"], "arguments": test_req["params"]}
+                })
+                lines.append(f"   ✅ Tool definition exists: {test_req['tool']}")
+                lines.append(f"   ✅ Required role: {test_req['expected_role']}")
+                lines.append(f"   ✅ Parameters validated: {list(test_req['params'].keys())}")
+                lines.append(f"   ✅ Request encoded: {len(payload)} bytes")
+                
+            except Exception as e:
+                lines.append(f"   ❌ Error: {e}")
+        return lines
+    
+    results = await asyncio.gather(*(run_one(r) for r in TEST_REQUESTS), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            print(f"\n   ❌ Error: {result}")
+            continue
+        for line in result:
+            print(line)
     
     print(f"\n🎉 MCP Server tools test completed!")
 
-async def test_gemini_integration():
-    """Test Gemini AI integration"""
+@functools.cache
+def _load_config():
+    """Import the server config once; it only reads the environment and .env"""
+    from config import config
+    return config
+
+async def check_gemini_integration(live: bool = False):
+    """Test Gemini AI integration, calling the API only when live is set"""
     print("\n🤖 Testing Gemini AI Integration...")
     
     try:
-        # Import config to test API key
-        from config import config
+        config = _load_config()
         
         if config.gemini_api_key and config.gemini_api_key != "your_gemini_api_key_here":
             print("   ✅ Gemini API key configured")
         else:
             print("   ⚠️  Gemini API key not set - tools will not work properly")
             
-        print("   ✅ Gemini model configured: gemini-pro")
-        print("   ✅ Max tokens: 4096")
-        print("   ✅ Temperature: 0.7")
+        print(f"   ✅ Gemini model configured: {config.gemini_model}")
+        print(f"   ✅ Max tokens: {config.max_tokens}")
+        print(f"   ✅ Temperature: {config.temperature}")
+        
+        if live:
+            # The SDK is heavy to import, so only load it for a live check
+            import google.generativeai as genai
+            
+            genai.configure(api_key=config.gemini_api_key)
+            model = genai.GenerativeModel(config.gemini_model)
+            response = await model.generate_content_async("Reply with 'Connection successful'.")
+            print(f"   ✅ Live Gemini call succeeded: {response.text[:50]}")
         
     except ImportError as e:
         print(f"   ❌ Config import error: {e}")
@@ -106,13 +146,13 @@ def test_server_structure():
         ".env.example"
     ]
     
-    missing_files = []
+    present = {entry.name for entry in os.scandir('.')}
+    missing_files = [file for file in required_files if file not in present]
     for file in required_files:
-        if os.path.exists(file):
+        if file in present:
             print(f"   ✅ {file}")
         else:
             print(f"   ❌ {file} (missing)")
-            missing_files.append(file)
             
     if missing_files:
         print(f"\n⚠️  Missing files: {', '.join(missing_files)}")
@@ -130,14 +170,18 @@ def test_dependencies():
         "dotenv"
     ]
     
+    # find_spec locates a module without executing it
     for package in required_packages:
         try:
-            __import__(package.replace("-", "_"))
+            spec = importlib.util.find_spec(package.replace("-", "_"))
+        except ModuleNotFoundError:
+            spec = None
+        if spec is not None:
             print(f"   ✅ {package}")
-        except ImportError:
+        else:
             print(f"   ❌ {package} (not installed)")
 
-async def main():
+async def main(batch_size: int = 8, live: bool = False):
     """Main test function"""
     print("🚀 Meridian MCP Server Test Suite")
     print("=" * 50)
@@ -149,10 +193,10 @@ async def main():
     test_dependencies()
     
     # Test Gemini integration
-    await test_gemini_integration()
+    await check_gemini_integration(live)
     
     # Test MCP tools
-    await test_mcp_tools()
+    await check_mcp_tools(batch_size)
     
     print("\n" + "=" * 50)
     print("✅ Test Suite Complete!")
@@ -162,7 +206,28 @@ async def main():
     print("3. Start the MCP server: python3.13 server.py")
     print("4. Connect Claude Desktop or other MCP client")
 
+# pytest entry points; loop and mcp_server come from conftest.py
+
+def test_mcp_tools(loop, mcp_server):
+    from mcp.types import ListToolsRequest
+
+    loop.run_until_complete(check_mcp_tools())
+    tools = loop.run_until_complete(mcp_server.list_tools(ListToolsRequest(method="tools/list")))
+    names = {tool.name for tool in tools}
+    for test_req in TEST_REQUESTS:
+        assert test_req["tool"] in names
+
+def test_gemini_integration(loop):
+    loop.run_until_complete(check_gemini_integration())
+
 if __name__ == "__main__":
-    # Change to the mcp-server directory
-    os.chdir('/Users/arnabmaity/Documents/Meridian/mcp-server')
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Meridian MCP Server test suite")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="maximum number of tool requests tested concurrently")
+    parser.add_argument("--live", action="store_true",
+                        help="make a real Gemini API call instead of only checking the config")
+    args = parser.parse_args()
+    
+    # Run from the mcp-server directory, restoring the cwd afterwards
+    with chdir(Path(__file__).resolve().parent):
+        run(main(args.batch_size, args.live))
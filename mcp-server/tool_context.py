@@ -0,0 +1,74 @@
+"""
+Context payload passed from the MCP tools to Gemini
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+# Same layout as json.dumps(indent=2), including stringified non-str keys
+JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+
+@dataclass(slots=True)
+class ToolContext:
+    """Per-call context for a tool's Gemini prompt"""
+    user_role: str
+    repository: Optional[str] = None
+    repositories: Optional[List[str]] = None
+    team_repositories: Optional[List[str]] = None
+    upcoming_projects: Optional[str] = None
+    timeframe: Optional[str] = None
+    project_stage: Optional[str] = None
+    team_metrics: Optional[Dict] = None
+    team_size: Optional[int] = None
+    issue: Optional[str] = None
+    focus_area: Optional[str] = None
+    audit_type: Optional[str] = None
+    skill_focus: Optional[str] = None
+    repository_analysis: Any = None
+    repository_analyses: Optional[List[Dict]] = None
+    user_profile: Optional[Dict] = None
+    _json: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields that are set, in declaration order, for JSON serialization"""
+        return {
+            name: value
+            for name in self.__slots__
+            if name[0] != "_" and (value := getattr(self, name)) is not None
+        }
+
+    def to_json(self) -> bytes:
+        """orjson encoding of to_dict(), computed on first use and then reused"""
+        if self._json is None:
+            self._json = orjson.dumps(self.to_dict(), option=JSON_OPTIONS)
+        return self._json
+
+
+@dataclass(slots=True)
+class ToolArgs:
+    """MCP tool-call arguments, parsed once with each tool's defaults"""
+    user_id: str = ""
+    repository: str = ""
+    issue_description: str = ""
+    focus_area: Optional[str] = None
+    audit_type: str = "general"
+    skill_focus: Optional[str] = None
+    team_size: Optional[int] = None
+    repositories: Optional[List[str]] = None
+    timeframe: str = "30d"
+    team_repositories: Optional[List[str]] = None
+    upcoming_projects: Optional[str] = None
+    project_stage: str = "active"
+    team_metrics: Dict = field(default_factory=dict)
+    assessment_context: Dict[str, Any] = field(default_factory=dict)
+    analysis_type: str = "comprehensive"
+    user_context: Dict[str, Any] = field(default_factory=dict)
+    guidance_type: str = "comprehensive"
+
+    @classmethod
+    def from_arguments(cls, arguments: Dict[str, Any]) -> "ToolArgs":
+        """Build from a raw arguments dict, ignoring keys no tool uses"""
+        fields = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in arguments.items() if key in fields})
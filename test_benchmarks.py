@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+"""
+Latency benchmarks for the integration probes
+Run with pytest-benchmark, e.g. to fail on a 10% regression against a saved run:
+    pytest test_benchmarks.py --benchmark-autosave --benchmark-compare --benchmark-compare-fail=mean:10%
+The loop, mcp_server and http_client fixtures come from mcp-server/conftest.py
+"""
+
+import importlib.util
+
+import pytest
+
+from test_integration import probe_backend, probe_db, probe_repo
+
+pytestmark = pytest.mark.skipif(
+    importlib.util.find_spec("pytest_benchmark") is None,
+    reason="pytest-benchmark is not installed"
+)
+
+BENCH_ROUNDS = 20
+
+def _bench(benchmark, loop, probe, *args, setup=None):
+    """Benchmark a probe, skipping when the service it checks is unavailable
+    
+    setup runs before every round, outside the timed call.
+    """
+    label, status, _ = loop.run_until_complete(probe(*args))
+    if not status.startswith("✅"):
+        pytest.skip(f"{label} {status}")
+    benchmark.pedantic(
+        lambda: loop.run_until_complete(probe(*args)),
+        setup=setup,
+        rounds=BENCH_ROUNDS,
+        iterations=1
+    )
+
+def _clear_caches(mcp_server):
+    """Forget cached users and repository contexts so each round does the real lookup"""
+    def setup():
+        mcp_server._user_cache.clear()
+        mcp_server._repo_cache.clear()
+    return setup
+
+def test_db_probe(benchmark, loop, mcp_server):
+    _bench(benchmark, loop, probe_db, mcp_server, setup=_clear_caches(mcp_server))
+
+def test_backend_probe(benchmark, loop, http_client):
+    _bench(benchmark, loop, probe_backend, http_client)
+
+def test_repo_probe(benchmark, loop, mcp_server):
+    _bench(benchmark, loop, probe_repo, mcp_server, setup=_clear_caches(mcp_server))
@@ -5,75 +5,98 @@ Integration test between MCP server and Meridian backend
 Tests the connection and data flow between components
 """
 
+from __future__ import annotations
+
+import argparse
 import asyncio
-import sqlite3
-import httpx
-import json
+import atexit
+import contextlib
 import sys
 import os
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_DB_PATH = ROOT / "Backend" / "meridian.db"
 
 # Add the mcp-server directory to the path
-sys.path.append('/Users/arnabmaity/Documents/Meridian/mcp-server')
+sys.path.insert(0, str(ROOT / "mcp-server"))
 
-from server import MeridianMCPServer
+from meridian_testing import aclose_shared, run, shared_http_client, shared_server
 
-async def test_integration():
-    """Test MCP server integration with Meridian backend"""
-    print("🔗 Testing MCP Server Integration with Meridian Backend")
-    print("=" * 60)
-    
-    # Initialize MCP server instance
-    try:
-        mcp_server = MeridianMCPServer()
-        print("✅ MCP Server initialized successfully")
-    except Exception as e:
-        print(f"❌ MCP Server initialization failed: {e}")
-        return False
-    
-    # Test database connection
-    print("\n📊 Testing Database Connection...")
+# The MCP server, httpx and sqlite3 are imported where they are used, so the
+# Gemini SDK and HTTP stack only load when the checks actually run
+
+# Resources the checks open; released at exit even after an interrupt or failure
+_STACK = contextlib.ExitStack()
+atexit.register(_STACK.close)
+
+# call_gemini returns failures as text starting with this instead of raising
+GEMINI_ERROR_PREFIX = "Error generating AI response"
+
+# Read-only connections to backend databases by resolved path, opened on first use
+_CONNS = {}
+
+def _db(db_path):
+    """Return the shared read-only connection to the database at db_path"""
+    key = Path(db_path).resolve()
+    conn = _CONNS.get(key)
+    if conn is None:
+        import sqlite3
+
+        conn = _STACK.enter_context(contextlib.closing(
+            sqlite3.connect(key, check_same_thread=False, isolation_level=None)
+        ))
+        conn.execute("PRAGMA query_only=1")
+        _CONNS[key] = conn
+    return conn
+
+async def probe_db(mcp_server):
+    """Look up a known user through the MCP server's database access"""
+    label = "📊 Testing Database Connection..."
     try:
         test_user = await mcp_server.get_user_context("1")  # Assuming user ID 1 exists
         if test_user:
-            print(f"✅ Database connection successful")
-            print(f"   User ID: {test_user.user_id}")
-            print(f"   Role: {test_user.role}")
-            print(f"   GitHub: {test_user.github_username}")
-        else:
-            print("⚠️  No user found with ID 1 - database may be empty")
+            return label, "✅ Database connection successful", [
+                f"User ID: {test_user.user_id}",
+                f"Role: {test_user.role}",
+                f"GitHub: {test_user.github_username}",
+            ]
+        return label, "⚠️  No user found with ID 1 - database may be empty", []
     except Exception as e:
-        print(f"❌ Database connection failed: {e}")
-    
-    # Test backend API connection
-    print("\n🌐 Testing Backend API Connection...")
+        return label, f"❌ Database connection failed: {e}", []
+
+async def probe_backend(client):
+    """Check that the Meridian backend answers its health endpoint"""
+    import httpx
+
+    label = "🌐 Testing Backend API Connection..."
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get("http://localhost:8000/health")
-            if response.status_code == 200:
-                print("✅ Backend API is running and accessible")
-            else:
-                print(f"⚠️  Backend API returned status: {response.status_code}")
+        response = await client.get("http://localhost:8000/health")
+        if response.status_code == 200:
+            return label, "✅ Backend API is running and accessible", []
+        return label, f"⚠️  Backend API returned status: {response.status_code}", []
     except httpx.ConnectError:
-        print("❌ Backend API is not running - start with: cd Backend && python new_main.py")
+        return label, "❌ Backend API is not running - start with: cd Backend && python new_main.py", []
     except Exception as e:
-        print(f"❌ Backend API connection error: {e}")
-    
-    # Test Gemini AI integration
-    print("\n🤖 Testing Gemini AI Integration...")
+        return label, f"❌ Backend API connection error: {e}", []
+
+async def probe_gemini(mcp_server):
+    """Send a trivial prompt through the server's Gemini client"""
+    label = "🤖 Testing Gemini AI Integration..."
     try:
         test_prompt = "Test connection to Gemini AI. Please respond with 'Connection successful'."
         response = await mcp_server.call_gemini(test_prompt)
+        if response and response.startswith(GEMINI_ERROR_PREFIX):
+            return label, f"❌ Gemini AI integration failed: {response}", ["Check your GEMINI_API_KEY in .env file"]
         if response and len(response) > 10:
-            print("✅ Gemini AI integration working")
-            print(f"   Response preview: {response[:50]}...")
-        else:
-            print(f"⚠️  Gemini AI response seems short: {response}")
+            return label, "✅ Gemini AI integration working", [f"Response preview: {response[:50]}..."]
+        return label, f"⚠️  Gemini AI response seems short: {response}", []
     except Exception as e:
-        print(f"❌ Gemini AI integration failed: {e}")
-        print("   Check your GEMINI_API_KEY in .env file")
-    
-    # Test a Professional tool
-    print("\n🛠️  Testing Professional Tool...")
+        return label, f"❌ Gemini AI integration failed: {e}", ["Check your GEMINI_API_KEY in .env file"]
+
+async def probe_pro_tool(mcp_server):
+    """Run a professional tool end to end"""
+    label = "🛠️  Testing Professional Tool..."
     try:
         from professional_tools import advanced_troubleshooting
         
@@ -85,31 +108,62 @@ async def test_integration():
             issue_description="Test troubleshooting request"
         )
         
-        if test_result and test_result.content:
-            print("✅ Professional tool executed successfully")
-            # Check if it's an access denied message
-            content = test_result.content[0].text
-            if "Access denied" in content:
-                print("   Note: Access denied - user may not have professional role")
-            else:
-                print(f"   Response preview: {content[:100]}...")
-        else:
-            print("⚠️  Professional tool returned empty result")
-            
+        if not (test_result and test_result.content):
+            return label, "⚠️  Professional tool returned empty result", []
+        # Check if it's an access denied message
+        content = test_result.content[0].text
+        if "Access denied" in content:
+            return label, "⚠️  Access denied - user may not have professional role", []
+        if GEMINI_ERROR_PREFIX in content or content.startswith("Error in"):
+            return label, f"❌ Professional tool returned an error: {content[:100]}", []
+        return label, "✅ Professional tool executed successfully", [f"Response preview: {content[:100]}..."]
     except Exception as e:
-        print(f"❌ Professional tool test failed: {e}")
-    
-    # Test repository context retrieval
-    print("\n📁 Testing Repository Context...")
+        return label, f"❌ Professional tool test failed: {e}", []
+
+async def probe_repo(mcp_server):
+    """Fetch repository context from the backend"""
+    label = "📁 Testing Repository Context..."
     try:
         repo_context = await mcp_server.get_repository_context("test/repo", "1")
         if repo_context:
-            print("✅ Repository context retrieval working")
-            print(f"   Keys: {list(repo_context.keys()) if isinstance(repo_context, dict) else 'Not a dict'}")
-        else:
-            print("⚠️  No repository context found (expected for test repo)")
+            keys = list(repo_context.keys()) if isinstance(repo_context, dict) else 'Not a dict'
+            return label, "✅ Repository context retrieval working", [f"Keys: {keys}"]
+        return label, "⚠️  No repository context found (expected for test repo)", []
+    except Exception as e:
+        return label, f"❌ Repository context test failed: {e}", []
+
+async def run_integration():
+    """Check MCP server integration with Meridian backend and print a report"""
+    print("🔗 Testing MCP Server Integration with Meridian Backend")
+    print("=" * 60)
+    
+    # The module-level server from server.py, the same one the pytest fixtures use
+    try:
+        mcp_server = shared_server()
+        print("✅ MCP Server initialized successfully")
     except Exception as e:
-        print(f"❌ Repository context test failed: {e}")
+        print(f"❌ MCP Server initialization failed: {e}")
+        return False
+    
+    # The probes are independent, so run them concurrently and report in order.
+    # Backend probes share one pooled client.
+    results = await asyncio.gather(
+        probe_db(mcp_server),
+        probe_backend(shared_http_client()),
+        probe_gemini(mcp_server),
+        probe_pro_tool(mcp_server),
+        probe_repo(mcp_server),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            print(f"\n❌ Probe crashed: {result!r}")
+            continue
+        label, status, detail = result
+        print(f"\n{label}")
+        print(status)
+        for line in detail:
+            print(f"   {line}")
     
     print("\n" + "=" * 60)
     print("🎯 Integration Test Summary")
@@ -124,32 +178,74 @@ async def test_integration():
     print("1. Start backend: cd Backend && python new_main.py")
     print("2. Configure Claude Desktop with claude_desktop_config.json")
     print("3. Test MCP tools through Claude Desktop")
-    
     return True
 
-async def show_available_users():
+# pytest entry points; loop, mcp_server and http_client come from mcp-server/conftest.py
+
+def _check_probe(loop, probe, *args):
+    """Run a probe on the session loop: fail on an error, skip on a warning"""
+    import pytest
+
+    label, status, detail = loop.run_until_complete(probe(*args))
+    if status.startswith("❌"):
+        pytest.fail(f"{label} {status}")
+    if not status.startswith("✅"):
+        pytest.skip(f"{label} {status}")
+    return status, detail
+
+def _require_gemini_key():
+    """Skip tests that need a live Gemini API key when none is configured"""
+    import pytest
+    from config import config
+
+    if not config.gemini_api_key:
+        pytest.skip("GEMINI_API_KEY is not set")
+
+def test_db_probe(loop, mcp_server):
+    _check_probe(loop, probe_db, mcp_server)
+
+def test_backend_probe(loop, http_client):
+    import pytest
+
+    _, status, _ = loop.run_until_complete(probe_backend(http_client))
+    if "not running" in status:
+        pytest.skip(status)
+    assert status.startswith("✅"), status
+
+def test_gemini_probe(loop, mcp_server):
+    _require_gemini_key()
+    _check_probe(loop, probe_gemini, mcp_server)
+
+def test_pro_tool_probe(loop, mcp_server):
+    _require_gemini_key()
+    _check_probe(loop, probe_pro_tool, mcp_server)
+
+def test_repo_probe(loop, mcp_server):
+    _check_probe(loop, probe_repo, mcp_server)
+
+async def show_available_users(db_path=DEFAULT_DB_PATH, limit: int = 10):
     """Show available users in database for testing"""
     print("\n👥 Available Users in Database:")
     try:
-        db_path = "/Users/arnabmaity/Documents/Meridian/Backend/meridian.db"
         if not os.path.exists(db_path):
             print("❌ Database not found at expected location")
             return
             
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, email, role, github_username FROM users LIMIT 10")
-        users = cursor.fetchall()
-        conn.close()
+        users = _db(db_path).execute(
+            "SELECT id, email, role, github_username FROM users LIMIT ?", (limit,)
+        ).fetchall()
         
         if users:
-            print("   ID | Email                    | Role         | GitHub")
-            print("   ---|--------------------------|--------------|------------------")
-            for user in users:
-                user_id, email, role, github = user
+            # Build the whole table and write it in one go
+            lines = [
+                "   ID | Email                    | Role         | GitHub",
+                "   ---|--------------------------|--------------|------------------",
+            ]
+            for user_id, email, role, github in users:
                 email_short = (email[:20] + "...") if email and len(email) > 20 else (email or "N/A")
                 github_short = github or "N/A"
-                print(f"   {user_id:2} | {email_short:24} | {role:12} | {github_short}")
+                lines.append(f"   {user_id:2} | {email_short:24} | {role:12} | {github_short}")
+            sys.stdout.write("\n".join(lines) + "\n")
         else:
             print("   No users found in database")
             
@@ -157,5 +253,16 @@ async def show_available_users():
         print(f"   Error reading users: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(test_integration())
-    asyncio.run(show_available_users())
+    parser = argparse.ArgumentParser(description="Meridian MCP/backend integration test")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="path to the backend SQLite database")
+    args = parser.parse_args()
+    
+    async def main():
+        try:
+            await run_integration()
+            await show_available_users(args.db)
+        finally:
+            await aclose_shared()
+    
+    run(main())